@@ -277,7 +277,7 @@ def _migrate_add_graceful_shutdown_columns(engine) -> None:
         conn.commit()
 
 
-def _is_network_path(path: Path) -> bool:
+def is_network_path(path: Path) -> bool:
     """Detect if path is on a network filesystem.
 
     WAL mode doesn't work reliably on network filesystems (NFS, SMB, CIFS)
@@ -389,7 +389,7 @@ def create_database(project_dir: Path) -> tuple:
 
     # Choose journal mode based on filesystem type
     # WAL mode doesn't work reliably on network filesystems and can cause corruption
-    is_network = _is_network_path(project_dir)
+    is_network = is_network_path(project_dir)
     journal_mode = "DELETE" if is_network else "WAL"
 
     with engine.connect() as conn:
@@ -199,6 +199,7 @@ class ParallelOrchestrator:
         self._features_since_doc_admin = 0
         self._doc_admin_interval = self._load_doc_admin_interval_setting()
         self._doc_admin_running = False
+        self._doc_admin_head: str | None = None  # HEAD commit at the last doc-admin spawn
 
         # Session tracking for logging/debugging
         self.session_start_time: datetime = None
@@ -708,15 +709,37 @@ class ParallelOrchestrator:
             total_testing_agents=testing_count)
         return True, f"Started testing agent for feature #{feature_id}"
 
-    def _spawn_doc_admin_agent(self) -> tuple[bool, str]:
+    def _get_project_head(self) -> str | None:
+        """Return the project's HEAD commit SHA, or None if it can't be determined."""
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=str(self.project_dir),
+                capture_output=True,
+                text=True,
+                timeout=10,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def _spawn_doc_admin_agent(self, force: bool = False) -> tuple[bool, str]:
         """Spawn a doc-admin agent subprocess to maintain documentation.
 
         This runs as a background task and doesn't block other agents.
         Only one doc-admin agent runs at a time (enforced via lock file).
+
+        Unless forced, the spawn is skipped when HEAD hasn't moved since the
+        last successful doc-admin run - there is nothing new to document.
         """
         if self._doc_admin_running:
             return False, "Doc-admin agent already running"
 
+        head = self._get_project_head()
+        if not force and head is not None and head == self._doc_admin_head:
+            debug_log.log("DOC_ADMIN", f"Skipping - no commits since last run (HEAD {head[:12]})")
+            return False, "No commits since last doc-admin run"
+
         # Check lock file to prevent duplicates (handles manually-triggered doc-admin)
         doc_admin_lock = self.project_dir / ".doc-admin.lock"
         if doc_admin_lock.exists():
@@ -760,6 +783,7 @@ class ParallelOrchestrator:
             return False, f"Failed to start doc-admin agent: {e}"
 
         self._doc_admin_running = True
+        self._doc_admin_head = head
 
         # Start output reader thread (fire and forget - no feature tracking)
         def read_doc_admin_output():
@@ -771,6 +795,9 @@ class ParallelOrchestrator:
                 proc.wait()
             finally:
                 self._doc_admin_running = False
+                if proc.returncode != 0:
+                    # Let the next trigger retry the same HEAD
+                    self._doc_admin_head = None
                 status = "completed" if proc.returncode == 0 else "failed"
                 debug_log.log("DOC_ADMIN", f"Doc-admin agent {status}", return_code=proc.returncode)
                 print(f"[doc-admin] Agent {status}", flush=True)
@@ -785,7 +812,7 @@ class ParallelOrchestrator:
 
         Can be called from API endpoint for on-demand documentation updates.
         """
-        return self._spawn_doc_admin_agent()
+        return self._spawn_doc_admin_agent(force=True)
 
     def _setup_worktree_after_init(self) -> None:
         """Create git worktree for coding agents after initialization completes.
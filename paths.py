@@ -22,24 +22,33 @@ Structure:
     └── .progress_cache
 """
 
+import os
 from pathlib import Path
 
 # Base directory name for all autocoder files
 AUTOCODER_DIR = ".autocoder"
 
 
+def _ensure_dir(path: Path) -> Path:
+    """
+    Create a directory if needed.
+
+    Checked with a stat first: mkdir(exist_ok=True) on an existing
+    directory costs a failed mkdir and then a stat anyway.
+    """
+    if not path.is_dir():
+        path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def get_autocoder_dir(project_dir: Path) -> Path:
     """Get the .autocoder directory for a project, creating if needed."""
-    autocoder_dir = project_dir / AUTOCODER_DIR
-    autocoder_dir.mkdir(parents=True, exist_ok=True)
-    return autocoder_dir
+    return _ensure_dir(Path(project_dir) / AUTOCODER_DIR)
 
 
 def get_prompts_dir(project_dir: Path) -> Path:
     """Get the prompts directory (.autocoder/prompts/)."""
-    prompts_dir = get_autocoder_dir(project_dir) / "prompts"
-    prompts_dir.mkdir(parents=True, exist_ok=True)
-    return prompts_dir
+    return _ensure_dir(get_autocoder_dir(project_dir) / "prompts")
 
 
 def get_database_path(project_dir: Path) -> Path:
@@ -104,20 +113,33 @@ def get_database_files(project_dir: Path) -> list[Path]:
 
 
 # Migration support - check old locations
-def _db_has_features(db_path: Path) -> bool:
-    """Check if a database file has actual features."""
+def _db_has_features(db_path: Path, *, immutable: bool = False, unreadable: bool = False) -> bool:
+    """
+    Check if a database file has actual features.
+
+    Opened read-only, so a missing file is never created. immutable also
+    skips locking and stops a WAL database from growing -wal/-shm files;
+    only use it for databases nothing else is writing. Returns unreadable
+    when the database can't be opened or read.
+    """
     import sqlite3
-    if not db_path.exists():
-        return False
+    # A -wal may hold rows that an immutable connection wouldn't see
+    if immutable and not db_path.with_name(db_path.name + "-wal").exists():
+        mode = "ro&immutable=1"
+    else:
+        mode = "ro"
     try:
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM features")
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count > 0
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode={mode}", uri=True)
+    except Exception:
+        return unreadable
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'features'").fetchone() is None:
+            return False
+        return conn.execute("SELECT 1 FROM features LIMIT 1").fetchone() is not None
     except Exception:
-        return False
+        return unreadable
+    finally:
+        conn.close()
 
 
 def migrate_legacy_paths(project_dir: Path) -> list[str]:
@@ -135,23 +157,22 @@ def migrate_legacy_paths(project_dir: Path) -> list[str]:
     # Special handling for database - check if old has data but new is empty
     old_db = project_dir / "features.db"
     new_db = autocoder_dir / "features.db"
-    if old_db.exists() and _db_has_features(old_db):
-        if not new_db.exists() or not _db_has_features(new_db):
+    if old_db.exists() and _db_has_features(old_db, immutable=True):
+        # The new database may be in use; if it can't be read, keep it
+        if not new_db.exists() or not _db_has_features(new_db, unreadable=True):
             # Old has data, new is missing or empty - copy old to new
             try:
                 if new_db.exists():
                     new_db.unlink()
                 shutil.copy2(str(old_db), str(new_db))
                 migrated.append("features.db -> .autocoder/features.db (with data)")
-                # Also copy WAL files
+                # Also copy WAL files (copy2 overwrites any stale target)
                 for ext in ["-wal", "-shm"]:
-                    old_wal = project_dir / f"features.db{ext}"
-                    new_wal = autocoder_dir / f"features.db{ext}"
-                    if old_wal.exists():
-                        if new_wal.exists():
-                            new_wal.unlink()
-                        shutil.copy2(str(old_wal), str(new_wal))
-                        migrated.append(f"features.db{ext} -> .autocoder/features.db{ext}")
+                    try:
+                        shutil.copy2(str(project_dir / f"features.db{ext}"), str(autocoder_dir / f"features.db{ext}"))
+                    except FileNotFoundError:
+                        continue
+                    migrated.append(f"features.db{ext} -> .autocoder/features.db{ext}")
             except Exception as e:
                 print(f"[migration] Failed to migrate database: {e}")
 
@@ -164,16 +185,21 @@ def migrate_legacy_paths(project_dir: Path) -> list[str]:
     ]
 
     for old_path, new_path in control_files:
-        if old_path.exists() and not new_path.exists():
-            try:
-                shutil.move(str(old_path), str(new_path))
-                migrated.append(f"{old_path.name} -> .autocoder/{new_path.name}")
-            except Exception as e:
-                print(f"[migration] Failed to migrate {old_path}: {e}")
+        if new_path.exists():
+            continue
+        # Same parent filesystem, so a single rename replaces exists() + move()
+        try:
+            os.rename(old_path, new_path)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            print(f"[migration] Failed to migrate {old_path}: {e}")
+            continue
+        migrated.append(f"{old_path.name} -> .autocoder/{new_path.name}")
 
     # Migrate prompts directory
     old_prompts = project_dir / "prompts"
-    if old_prompts.exists() and old_prompts.is_dir():
+    if old_prompts.is_dir():
         for old_file in old_prompts.iterdir():
             new_file = prompts_dir / old_file.name
             if not new_file.exists():
@@ -27,39 +27,28 @@ def bump_version(version_file: Path) -> bool:
         True if version was bumped, False on error
     """
     try:
-        with open(version_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json.loads(version_file.read_text(encoding='utf-8'))
 
-        # Get current values
         year = data.get('year', 2026)
         major = data.get('major', 1)
-        minor = data.get('minor', 0)
-        patch = data.get('patch', 0)
-
-        # Increment patch, with rollover logic
-        patch += 1
-        if patch > 99:
-            patch = 0
-            minor += 1
-        if minor > 99:
-            minor = 0
-            major += 1
-
-        # Update version string
-        version_str = f"{year}.{major}.{minor}.{patch}"
 
-        # Update data
-        data['version'] = version_str
-        data['year'] = year
-        data['major'] = major
-        data['minor'] = minor
-        data['patch'] = patch
-        data['buildDate'] = datetime.now().strftime('%Y-%m-%d')
-
-        # Write back
-        with open(version_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-            f.write('\n')  # Add trailing newline
+        # Increment patch, carrying into minor/major past 99
+        carry, patch = divmod(data.get('patch', 0) + 1, 100)
+        carry, minor = divmod(data.get('minor', 0) + carry, 100)
+        major += carry
+
+        version_str = f"{year}.{major}.{minor}.{patch}"
+        data.update(
+            version=version_str,
+            year=year,
+            major=major,
+            minor=minor,
+            patch=patch,
+            buildDate=datetime.now().strftime('%Y-%m-%d'),
+        )
+
+        # Write back in one call, keeping the existing key order
+        version_file.write_text(json.dumps(data, indent=2) + '\n', encoding='utf-8')
 
         print(f"Version bumped to {version_str}")
         return True
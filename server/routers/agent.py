@@ -9,7 +9,10 @@ Includes auto-resume functionality that automatically restarts
 crashed agents when the autoResume setting is enabled.
 """
 
+import os
 import re
+import subprocess
+import sys
 from pathlib import Path
 
 from fastapi import APIRouter, HTTPException
@@ -22,13 +25,14 @@ from ..services.auto_resume_service import (
 )
 from ..services.process_manager import get_manager
 
+ROOT_DIR = Path(__file__).parent.parent.parent
+DOC_ADMIN_SCRIPT = ROOT_DIR / "autonomous_agent_demo.py"
+
 
 def _get_project_path(project_name: str) -> Path:
     """Get project path from registry."""
-    import sys
-    root = Path(__file__).parent.parent.parent
-    if str(root) not in sys.path:
-        sys.path.insert(0, str(root))
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
 
     from registry import get_project_path
     return get_project_path(project_name)
@@ -40,10 +44,8 @@ def _get_settings_defaults() -> tuple[bool, str, int]:
     Returns:
         Tuple of (yolo_mode, model, testing_agent_ratio)
     """
-    import sys
-    root = Path(__file__).parent.parent.parent
-    if str(root) not in sys.path:
-        sys.path.insert(0, str(root))
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
 
     from registry import DEFAULT_MODEL, get_all_settings
 
@@ -286,10 +288,6 @@ async def run_doc_admin(project_name: str):
     Works whether the main agent is running or not.
     Uses a lock file to prevent duplicate doc-admin agents.
     """
-    import os
-    import subprocess
-    import sys
-
     manager = get_project_manager(project_name)
     project_dir = _get_project_path(project_name)
     if not project_dir:
@@ -311,10 +309,9 @@ async def run_doc_admin(project_name: str):
             # Stale lock - will be cleaned up by the new process
             pass
 
-    root_dir = Path(__file__).parent.parent.parent
     cmd = [
         sys.executable, "-u",
-        str(root_dir / "autonomous_agent_demo.py"),
+        str(DOC_ADMIN_SCRIPT),
         "--project-dir", str(project_dir),
         "--agent-type", "doc-admin",
         "--max-iterations", "1",
@@ -328,7 +325,7 @@ async def run_doc_admin(project_name: str):
             stdin=subprocess.DEVNULL,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
-            cwd=str(root_dir),
+            cwd=str(ROOT_DIR),
         )
         return AgentActionResponse(
             success=True,
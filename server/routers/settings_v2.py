@@ -10,11 +10,14 @@ Unified settings API with proper separation of:
 This router provides the foundation for the redesigned Settings UI.
 """
 
+import asyncio
 import sys
+from collections import OrderedDict
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any, Literal
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
 # Add root to path for imports
@@ -25,13 +28,20 @@ if str(ROOT_DIR) not in sys.path:
 from registry import AVAILABLE_MODELS, DEFAULT_MODEL, get_project_path
 from settings import (
     BUILT_IN_DEFAULTS,
+    PROJECT_SETTINGS_FILE,
     AppSettings,
     ProjectSettings,
     SettingsManager,
+    settings_file_stamp,
 )
 
 router = APIRouter(prefix="/api/settings/v2", tags=["settings-v2"])
 
+# Model IDs accepted by the update endpoints (built once at import)
+_VALID_MODEL_IDS: frozenset[str] = frozenset(m["id"] for m in AVAILABLE_MODELS)
+_APP_MODEL_KEYS = frozenset({"defaultModel", "coderModel", "testerModel", "initializerModel"})
+_PROJECT_MODEL_KEYS = frozenset({"coderModel", "testerModel", "initializerModel"})
+
 
 # =============================================================================
 # Schemas
@@ -133,43 +143,155 @@ class SettingsCategoriesResponse(BaseModel):
     sources: dict[str, str]
 
 
+class ClearSettingResponse(BaseModel):
+    """Result of clearing a single project setting."""
+    success: bool
+    key: str
+
+
+class ResetSettingsResponse(BaseModel):
+    """Result of resetting app or project settings."""
+    success: bool
+    message: str
+    keysCleared: int
+
+
 # =============================================================================
 # Helper Functions
 # =============================================================================
 
 
-def _get_manager(project_name: str | None = None) -> SettingsManager:
-    """Get settings manager with optional project context."""
-    project_path = None
-    if project_name:
-        path_str = get_project_path(project_name)
-        if path_str:
-            project_path = Path(path_str)
-    return SettingsManager(project_path=project_path)
+async def _lookup_project_path(project_name: str) -> Path | None:
+    """Look up a registered project's path without blocking the event loop."""
+    # Not cached: the registry is shared with the CLI and other processes,
+    # so projects can be added, moved or removed at any time
+    return await asyncio.to_thread(get_project_path, project_name)
 
 
-def _settings_to_response(settings: dict, defaults: dict) -> dict:
+async def require_project_path(project_name: str) -> Path:
+    """Dependency resolving the {project_name} path parameter to the project's path (404 if unknown)."""
+    path_str = await _lookup_project_path(project_name)
+    if not path_str:
+        raise HTTPException(404, f"Project not found: {project_name}")
+    return Path(path_str)
+
+
+# Response keys and their fallbacks, resolved once from BUILT_IN_DEFAULTS.
+# Keys missing from the built-ins (or with UI-specific fallbacks) use literals.
+_APP_RESPONSE_FALLBACKS: dict[str, Any] = {
+    "defaultModel": BUILT_IN_DEFAULTS.get("defaultModel"),
+    "coderModel": BUILT_IN_DEFAULTS.get("coderModel"),
+    "testerModel": BUILT_IN_DEFAULTS.get("testerModel"),
+    "initializerModel": BUILT_IN_DEFAULTS.get("initializerModel"),
+    "maxConcurrency": BUILT_IN_DEFAULTS.get("maxConcurrency"),
+    "yoloMode": BUILT_IN_DEFAULTS.get("yoloMode"),
+    "autoResume": BUILT_IN_DEFAULTS.get("autoResume"),
+    "pauseOnError": BUILT_IN_DEFAULTS.get("pauseOnError"),
+    "testingAgentRatio": 1,
+    "theme": BUILT_IN_DEFAULTS.get("theme"),
+    "darkMode": False,
+    "showDebugPanel": BUILT_IN_DEFAULTS.get("showDebugPanel"),
+    "debugPanelHeight": 288,
+    "celebrateOnComplete": BUILT_IN_DEFAULTS.get("celebrateOnComplete"),
+    "kanbanColumns": 3,
+    "autoCommit": BUILT_IN_DEFAULTS.get("autoCommit"),
+    "commitMessagePrefix": BUILT_IN_DEFAULTS.get("commitMessagePrefix"),
+    "createPullRequests": BUILT_IN_DEFAULTS.get("createPullRequests"),
+}
+
+
+def _settings_to_response(settings: dict) -> dict:
     """Convert internal settings dict to response format."""
-    return {
-        "defaultModel": settings.get("defaultModel", defaults.get("defaultModel")),
-        "coderModel": settings.get("coderModel", defaults.get("coderModel")),
-        "testerModel": settings.get("testerModel", defaults.get("testerModel")),
-        "initializerModel": settings.get("initializerModel", defaults.get("initializerModel")),
-        "maxConcurrency": settings.get("maxConcurrency", defaults.get("maxConcurrency")),
-        "yoloMode": settings.get("yoloMode", defaults.get("yoloMode")),
-        "autoResume": settings.get("autoResume", defaults.get("autoResume")),
-        "pauseOnError": settings.get("pauseOnError", defaults.get("pauseOnError")),
-        "testingAgentRatio": settings.get("testingAgentRatio", 1),
-        "theme": settings.get("theme", defaults.get("theme")),
-        "darkMode": settings.get("darkMode", False),
-        "showDebugPanel": settings.get("showDebugPanel", defaults.get("showDebugPanel")),
-        "debugPanelHeight": settings.get("debugPanelHeight", 288),
-        "celebrateOnComplete": settings.get("celebrateOnComplete", defaults.get("celebrateOnComplete")),
-        "kanbanColumns": settings.get("kanbanColumns", 3),
-        "autoCommit": settings.get("autoCommit", defaults.get("autoCommit")),
-        "commitMessagePrefix": settings.get("commitMessagePrefix", defaults.get("commitMessagePrefix")),
-        "createPullRequests": settings.get("createPullRequests", defaults.get("createPullRequests")),
+    return {key: settings.get(key, fallback) for key, fallback in _APP_RESPONSE_FALLBACKS.items()}
+
+
+# Project overrides exposed by ProjectSettingsResponse (unset keys stay None)
+_PROJECT_RESPONSE_KEYS = tuple(ProjectSettingsResponse.model_fields)
+
+
+def _project_settings_to_response(settings: dict) -> dict:
+    """Convert a project's override dict to response format."""
+    return {key: settings.get(key) for key in _PROJECT_RESPONSE_KEYS}
+
+
+# Merged-settings responses, reused while neither settings file has changed.
+# Keyed on the files' stamps rather than on writes through this router, since
+# the files can also be edited by hand.
+_RESPONSE_CACHE_SIZE = 128
+_response_cache: OrderedDict[tuple[str, Path | None], tuple[tuple, BaseModel]] = OrderedDict()
+
+
+def _cached_response(kind: str, project_path: Path | None, build: Callable[[], BaseModel]) -> BaseModel:
+    """Return the cached response for (kind, project), rebuilding it if a settings file changed."""
+    stamps = (
+        settings_file_stamp(AppSettings().settings_file),
+        settings_file_stamp(project_path / PROJECT_SETTINGS_FILE) if project_path else None,
+    )
+    key = (kind, project_path)
+    cached = _response_cache.get(key)
+    if cached is not None and cached[0] == stamps:
+        _response_cache.move_to_end(key)
+        return cached[1]
+
+    response = build()
+    _response_cache[key] = (stamps, response)
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > _RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+    return response
+
+
+def _build_effective_response(project_path: Path | None) -> EffectiveSettingsResponse:
+    """Build the merged settings response for a project (or app-only)."""
+    manager = SettingsManager(project_path=project_path)
+    return EffectiveSettingsResponse(
+        settings=manager.get_effective_settings(),
+        sources=manager.get_all_sources(),
+    )
+
+
+# Settings shown in each UI category, with the fallback used when a key has
+# no effective value
+_CATEGORY_SCHEMA: dict[str, dict[str, Any]] = {
+    "models": {
+        "defaultModel": None,
+        "coderModel": None,
+        "testerModel": None,
+        "initializerModel": None,
+    },
+    "agents": {
+        "maxConcurrency": None,
+        "yoloMode": None,
+        "autoResume": None,
+        "pauseOnError": None,
+        "testingAgentRatio": 1,
+    },
+    "ui": {
+        "theme": None,
+        "darkMode": False,
+        "showDebugPanel": None,
+        "debugPanelHeight": 288,
+        "celebrateOnComplete": None,
+        "kanbanColumns": 3,
+    },
+    "git": {
+        "autoCommit": None,
+        "commitMessagePrefix": None,
+        "createPullRequests": None,
+    },
+}
+
+
+def _build_categories_response(project_path: Path | None) -> SettingsCategoriesResponse:
+    """Build the settings-by-category response for a project (or app-only)."""
+    manager = SettingsManager(project_path=project_path)
+    effective = manager.get_effective_settings()
+
+    categories = {
+        category: {key: effective.get(key, fallback) for key, fallback in keys.items()}
+        for category, keys in _CATEGORY_SCHEMA.items()
     }
+    return SettingsCategoriesResponse(**categories, sources=manager.get_all_sources())
 
 
 # =============================================================================
@@ -184,7 +306,7 @@ async def get_app_settings():
     app_settings.load()
 
     return AppSettingsResponse(
-        **_settings_to_response(app_settings.settings, BUILT_IN_DEFAULTS)
+        **_settings_to_response(app_settings.settings)
     )
 
 
@@ -198,16 +320,14 @@ async def update_app_settings(update: AppSettingsUpdate):
     update_dict = update.model_dump(exclude_none=True)
     for key, value in update_dict.items():
         # Validate model IDs
-        if key in ("defaultModel", "coderModel", "testerModel", "initializerModel"):
-            valid_ids = [m["id"] for m in AVAILABLE_MODELS]
-            if value not in valid_ids:
-                raise HTTPException(400, f"Invalid model: {value}")
+        if key in _APP_MODEL_KEYS and value not in _VALID_MODEL_IDS:
+            raise HTTPException(400, f"Invalid model: {value}")
         app_settings.set(key, value)
 
     app_settings.save()
 
     return AppSettingsResponse(
-        **_settings_to_response(app_settings.settings, BUILT_IN_DEFAULTS)
+        **_settings_to_response(app_settings.settings)
     )
 
 
@@ -217,69 +337,41 @@ async def update_app_settings(update: AppSettingsUpdate):
 
 
 @router.get("/project/{project_name}", response_model=ProjectSettingsResponse)
-async def get_project_settings(project_name: str):
+async def get_project_settings(project_path: Path = Depends(require_project_path)):
     """Get project-level settings (overrides only)."""
-    path_str = get_project_path(project_name)
-    if not path_str:
-        raise HTTPException(404, f"Project not found: {project_name}")
-
-    project_settings = ProjectSettings(project_path=Path(path_str))
+    project_settings = ProjectSettings(project_path=project_path)
     project_settings.load()
 
     return ProjectSettingsResponse(
-        coderModel=project_settings.get("coderModel"),
-        testerModel=project_settings.get("testerModel"),
-        initializerModel=project_settings.get("initializerModel"),
-        maxConcurrency=project_settings.get("maxConcurrency"),
-        yoloMode=project_settings.get("yoloMode"),
-        testingAgentRatio=project_settings.get("testingAgentRatio"),
-        testingDirectory=project_settings.get("testingDirectory"),
-        autoCommit=project_settings.get("autoCommit"),
+        **_project_settings_to_response(project_settings.settings)
     )
 
 
 @router.patch("/project/{project_name}", response_model=ProjectSettingsResponse)
-async def update_project_settings(project_name: str, update: ProjectSettingsUpdate):
+async def update_project_settings(update: ProjectSettingsUpdate, project_path: Path = Depends(require_project_path)):
     """Update project-level settings."""
-    path_str = get_project_path(project_name)
-    if not path_str:
-        raise HTTPException(404, f"Project not found: {project_name}")
-
-    project_settings = ProjectSettings(project_path=Path(path_str))
+    project_settings = ProjectSettings(project_path=project_path)
     project_settings.load()
 
     # Apply updates (only non-None values)
     update_dict = update.model_dump(exclude_none=True)
     for key, value in update_dict.items():
         # Validate model IDs
-        if key in ("coderModel", "testerModel", "initializerModel"):
-            valid_ids = [m["id"] for m in AVAILABLE_MODELS]
-            if value not in valid_ids:
-                raise HTTPException(400, f"Invalid model: {value}")
+        if key in _PROJECT_MODEL_KEYS and value not in _VALID_MODEL_IDS:
+            raise HTTPException(400, f"Invalid model: {value}")
         project_settings.set(key, value)
 
     project_settings.save()
 
     return ProjectSettingsResponse(
-        coderModel=project_settings.get("coderModel"),
-        testerModel=project_settings.get("testerModel"),
-        initializerModel=project_settings.get("initializerModel"),
-        maxConcurrency=project_settings.get("maxConcurrency"),
-        yoloMode=project_settings.get("yoloMode"),
-        testingAgentRatio=project_settings.get("testingAgentRatio"),
-        testingDirectory=project_settings.get("testingDirectory"),
-        autoCommit=project_settings.get("autoCommit"),
+        **_project_settings_to_response(project_settings.settings)
     )
 
 
-@router.delete("/project/{project_name}/{key}")
-async def clear_project_setting(project_name: str, key: str):
+@router.delete("/project/{project_name}/{key}", response_model=ClearSettingResponse)
+async def clear_project_setting(key: str, project_path: Path = Depends(require_project_path)):
     """Clear a project-level setting (fall back to app/default)."""
-    path_str = get_project_path(project_name)
-    if not path_str:
-        raise HTTPException(404, f"Project not found: {project_name}")
-
-    project_settings = ProjectSettings(project_path=Path(path_str))
+    project_settings = ProjectSettings(project_path=project_path)
     project_settings.load()
 
     deleted = project_settings.delete(key)
@@ -289,40 +381,30 @@ async def clear_project_setting(project_name: str, key: str):
     return {"success": deleted, "key": key}
 
 
-@router.post("/project/{project_name}/reset")
-async def reset_project_settings(project_name: str):
+@router.post("/project/{project_name}/reset", response_model=ResetSettingsResponse)
+async def reset_project_settings(project_path: Path = Depends(require_project_path)):
     """Reset all project-level settings (clear all overrides)."""
-    path_str = get_project_path(project_name)
-    if not path_str:
-        raise HTTPException(404, f"Project not found: {project_name}")
-
-    project_settings = ProjectSettings(project_path=Path(path_str))
+    project_settings = ProjectSettings(project_path=project_path)
     project_settings.load()
 
     # Clear all settings
-    keys_to_clear = list(project_settings.settings.keys())
-    for key in keys_to_clear:
-        project_settings.delete(key)
-
+    keys_cleared = project_settings.clear_all()
     project_settings.save()
 
-    return {"success": True, "message": "All project settings reset", "keysCleared": len(keys_to_clear)}
+    return {"success": True, "message": "All project settings reset", "keysCleared": keys_cleared}
 
 
-@router.post("/app/reset")
+@router.post("/app/reset", response_model=ResetSettingsResponse)
 async def reset_app_settings():
     """Reset all app-level settings to built-in defaults."""
     app_settings = AppSettings()
     app_settings.load()
 
     # Clear all settings (they will fall back to BUILT_IN_DEFAULTS)
-    keys_to_clear = list(app_settings.settings.keys())
-    for key in keys_to_clear:
-        app_settings.delete(key)
-
+    keys_cleared = app_settings.clear_all()
     app_settings.save()
 
-    return {"success": True, "message": "All app settings reset to defaults", "keysCleared": len(keys_to_clear)}
+    return {"success": True, "message": "All app settings reset to defaults", "keysCleared": keys_cleared}
 
 
 # =============================================================================
@@ -333,73 +415,18 @@ async def reset_app_settings():
 @router.get("/effective", response_model=EffectiveSettingsResponse)
 async def get_effective_settings_no_project():
     """Get effective settings without project context (app + defaults)."""
-    manager = SettingsManager()
-    effective = manager.get_effective_settings()
-
-    # Build sources
-    sources = {}
-    for key in effective:
-        sources[key] = manager.get_setting_source(key)
-
-    return EffectiveSettingsResponse(settings=effective, sources=sources)
+    return _cached_response("effective", None, lambda: _build_effective_response(None))
 
 
 @router.get("/effective/{project_name}", response_model=EffectiveSettingsResponse)
-async def get_effective_settings(project_name: str):
+async def get_effective_settings(project_path: Path = Depends(require_project_path)):
     """Get effective settings for a project (project + app + defaults)."""
-    path_str = get_project_path(project_name)
-    if not path_str:
-        raise HTTPException(404, f"Project not found: {project_name}")
-
-    manager = SettingsManager(project_path=Path(path_str))
-    effective = manager.get_effective_settings()
-
-    # Build sources
-    sources = {}
-    for key in effective:
-        sources[key] = manager.get_setting_source(key)
-
-    return EffectiveSettingsResponse(settings=effective, sources=sources)
+    return _cached_response("effective", project_path, lambda: _build_effective_response(project_path))
 
 
 @router.get("/categories/{project_name}", response_model=SettingsCategoriesResponse)
 async def get_settings_by_category(project_name: str):
     """Get settings organized by category for the UI."""
-    path_str = get_project_path(project_name)
+    path_str = await _lookup_project_path(project_name)
     project_path = Path(path_str) if path_str else None
-
-    manager = SettingsManager(project_path=project_path)
-    effective = manager.get_effective_settings()
-
-    # Build sources
-    sources = {key: manager.get_setting_source(key) for key in effective}
-
-    return SettingsCategoriesResponse(
-        models={
-            "defaultModel": effective.get("defaultModel"),
-            "coderModel": effective.get("coderModel"),
-            "testerModel": effective.get("testerModel"),
-            "initializerModel": effective.get("initializerModel"),
-        },
-        agents={
-            "maxConcurrency": effective.get("maxConcurrency"),
-            "yoloMode": effective.get("yoloMode"),
-            "autoResume": effective.get("autoResume"),
-            "pauseOnError": effective.get("pauseOnError"),
-            "testingAgentRatio": effective.get("testingAgentRatio", 1),
-        },
-        ui={
-            "theme": effective.get("theme"),
-            "darkMode": effective.get("darkMode", False),
-            "showDebugPanel": effective.get("showDebugPanel"),
-            "debugPanelHeight": effective.get("debugPanelHeight", 288),
-            "celebrateOnComplete": effective.get("celebrateOnComplete"),
-            "kanbanColumns": effective.get("kanbanColumns", 3),
-        },
-        git={
-            "autoCommit": effective.get("autoCommit"),
-            "commitMessagePrefix": effective.get("commitMessagePrefix"),
-            "createPullRequests": effective.get("createPullRequests"),
-        },
-        sources=sources,
-    )
+    return _cached_response("categories", project_path, lambda: _build_categories_response(project_path))
@@ -73,6 +73,27 @@ READONLY_BUILTIN_TOOLS = [
 ]
 
 
+# Max characters of app_spec.txt embedded in the assistant system prompt
+APP_SPEC_PROMPT_LIMIT = 5000
+
+
+def _truncate_at_boundary(text: str, limit: int) -> str:
+    """Truncate text to at most `limit` chars, ending on a paragraph or line break.
+
+    Cutting mid-line leaves a dangling tag or sentence that costs tokens
+    without giving the model usable context.
+    """
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    # Prefer a blank-line break, then any line break, if it keeps most of the text
+    for sep in ("\n\n", "\n"):
+        cut = head.rfind(sep)
+        if cut >= limit // 2:
+            return head[:cut].rstrip()
+    return head
+
+
 def get_system_prompt(project_name: str, project_dir: Path) -> str:
     """Generate the system prompt for the assistant with project context."""
     # Try to load app_spec.txt for context
@@ -82,8 +103,10 @@ def get_system_prompt(project_name: str, project_dir: Path) -> str:
         try:
             app_spec_content = app_spec_path.read_text(encoding="utf-8")
             # Truncate if too long
-            if len(app_spec_content) > 5000:
-                app_spec_content = app_spec_content[:5000] + "\n... (truncated)"
+            if len(app_spec_content) > APP_SPEC_PROMPT_LIMIT:
+                app_spec_content = (
+                    _truncate_at_boundary(app_spec_content, APP_SPEC_PROMPT_LIMIT) + "\n... (truncated)"
+                )
         except Exception as e:
             logger.warning(f"Failed to read app_spec.txt: {e}")
 
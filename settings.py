@@ -15,6 +15,8 @@ This module provides:
 import json
 import logging
 import os
+import threading
+import time
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
@@ -73,6 +75,109 @@ PROJECT_SETTINGS_FILE = ".autocoder/settings.json"
 APP_SETTINGS_FILE = "settings.json"
 
 
+# =============================================================================
+# Settings File Cache
+# =============================================================================
+
+# Parsed settings files, reused while the file's stamp is unchanged. Keyed on
+# the file itself so edits made with a text editor are picked up on the next
+# load.
+_file_cache: dict[Path, tuple[tuple[int, int, int], dict[str, Any]]] = {}
+
+
+def settings_file_stamp(path: Path) -> tuple[int, int, int] | None:
+    """
+    Return a settings file's (mtime_ns, size, inode), or None if it doesn't exist.
+
+    Writes replace the file with a new one, so the inode changes even when a
+    coarse mtime and the size don't.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_settings_file(path: Path) -> dict[str, Any]:
+    """
+    Read a settings JSON file, reusing the last parse if the file is unchanged.
+
+    Returns a shallow copy so callers can mutate it freely.
+
+    Raises:
+        json.JSONDecodeError, OSError: If the file can't be read or parsed.
+    """
+    stamp = settings_file_stamp(path)
+    if stamp is None:
+        _file_cache.pop(path, None)
+        return {}
+
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return dict(cached[1])
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _file_cache[path] = (stamp, data)
+    return dict(data)
+
+
+# Attempts at renaming over a settings file, and the pause between them.
+# Windows refuses the rename while another process has the file open.
+_REPLACE_ATTEMPTS = 5
+_REPLACE_RETRY_DELAY = 0.05
+
+
+def _replace_settings_file(tmp_path: Path, path: Path, data: dict[str, Any]) -> None:
+    """Move a written temporary file over path, writing path in place if it stays locked."""
+    for attempt in range(_REPLACE_ATTEMPTS):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt + 1 < _REPLACE_ATTEMPTS:
+                time.sleep(_REPLACE_RETRY_DELAY)
+
+    logger.warning("Could not replace %s, writing it in place", path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def _write_settings_file(path: Path, data: dict[str, Any]) -> bool:
+    """
+    Write a settings JSON file atomically, skipping the write if nothing changed.
+
+    The file is written to a temporary file in the same directory and then
+    renamed over the target, so readers in other processes never see a
+    partially written file. If the rename keeps failing because the file
+    is open elsewhere (Windows), it is written in place instead.
+
+    Returns:
+        True if the file was written, False if it already held these settings.
+    """
+    stamp = settings_file_stamp(path)
+    cached = _file_cache.get(path)
+    if stamp is not None and cached is not None and cached[0] == stamp and cached[1] == data:
+        return False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process and thread; created with open() so the usual umask applies
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        _replace_settings_file(tmp_path, path, data)
+    finally:
+        # Gone once renamed; left behind by a failure or the in-place fallback
+        tmp_path.unlink(missing_ok=True)
+
+    new_stamp = settings_file_stamp(path)
+    if new_stamp is not None:
+        _file_cache[path] = (new_stamp, dict(data))
+    return True
+
+
 # =============================================================================
 # Data Classes
 # =============================================================================
@@ -90,25 +195,17 @@ class ProjectSettings:
 
     def load(self) -> None:
         """Load settings from the project's settings file."""
-        if self.settings_file.exists():
-            try:
-                with open(self.settings_file, "r", encoding="utf-8") as f:
-                    self.settings = json.load(f)
-                logger.debug("Loaded project settings from %s", self.settings_file)
-            except (json.JSONDecodeError, OSError) as e:
-                logger.warning("Failed to load project settings: %s", e)
-                self.settings = {}
-        else:
+        try:
+            self.settings = _read_settings_file(self.settings_file)
+            logger.debug("Loaded project settings from %s", self.settings_file)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning("Failed to load project settings: %s", e)
             self.settings = {}
 
     def save(self) -> None:
         """Save settings to the project's settings file."""
-        # Ensure the .autocoder directory exists
-        self.settings_file.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(self.settings_file, "w", encoding="utf-8") as f:
-            json.dump(self.settings, f, indent=2)
-        logger.debug("Saved project settings to %s", self.settings_file)
+        if _write_settings_file(self.settings_file, self.settings):
+            logger.debug("Saved project settings to %s", self.settings_file)
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a setting value."""
@@ -125,6 +222,12 @@ class ProjectSettings:
             return True
         return False
 
+    def clear_all(self) -> int:
+        """Delete all settings. Returns the number of keys cleared."""
+        count = len(self.settings)
+        self.settings.clear()
+        return count
+
 
 @dataclass
 class AppSettings:
@@ -139,24 +242,17 @@ class AppSettings:
 
     def load(self) -> None:
         """Load settings from the app settings file."""
-        if self.settings_file.exists():
-            try:
-                with open(self.settings_file, "r", encoding="utf-8") as f:
-                    self.settings = json.load(f)
-                logger.debug("Loaded app settings from %s", self.settings_file)
-            except (json.JSONDecodeError, OSError) as e:
-                logger.warning("Failed to load app settings: %s", e)
-                self.settings = {}
-        else:
+        try:
+            self.settings = _read_settings_file(self.settings_file)
+            logger.debug("Loaded app settings from %s", self.settings_file)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning("Failed to load app settings: %s", e)
             self.settings = {}
 
     def save(self) -> None:
         """Save settings to the app settings file."""
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-
-        with open(self.settings_file, "w", encoding="utf-8") as f:
-            json.dump(self.settings, f, indent=2)
-        logger.debug("Saved app settings to %s", self.settings_file)
+        if _write_settings_file(self.settings_file, self.settings):
+            logger.debug("Saved app settings to %s", self.settings_file)
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a setting value."""
@@ -173,6 +269,12 @@ class AppSettings:
             return True
         return False
 
+    def clear_all(self) -> int:
+        """Delete all settings. Returns the number of keys cleared."""
+        count = len(self.settings)
+        self.settings.clear()
+        return count
+
 
 # =============================================================================
 # Settings Manager
@@ -311,6 +413,22 @@ class SettingsManager:
             return "app"
         return "default"
 
+    def get_all_sources(self) -> dict[str, str]:
+        """
+        Get the source of every effective setting in one pass.
+
+        Equivalent to calling get_setting_source() for each key of
+        get_effective_settings(), without re-checking each layer per key.
+
+        Returns:
+            Dictionary mapping setting key to "project", "app", or "default"
+        """
+        sources = dict.fromkeys(BUILT_IN_DEFAULTS, "default")
+        sources.update(dict.fromkeys(self.app_settings.settings, "app"))
+        if self.project_settings:
+            sources.update(dict.fromkeys(self.project_settings.settings, "project"))
+        return sources
+
     def validate_model_setting(self, model_id: str) -> bool:
         """Check if a model ID is valid."""
         return model_id in VALID_MODEL_IDS
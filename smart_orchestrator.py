@@ -6,27 +6,83 @@ Enhanced orchestrator with learning capabilities that tracks feature success
 patterns and optimizes model selection and retry strategies.
 """
 
+import atexit
+import functools
 import logging
+import math
+import threading
+import time
+import weakref
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-from sqlalchemy import Column, DateTime, Float, Index, Integer, String, Text, create_engine
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    case,
+    create_engine,
+    event,
+    exists,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.types import JSON
 
+from api.database import is_network_path
+
+# orjson is optional; when installed it encodes and decodes the JSON columns
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
+# Rows fetched per batch when listing stats, so large tables are converted
+# to dicts incrementally instead of being fetched all at once
+STATS_BATCH_SIZE = 500
+
 Base = declarative_base()
 
+# Learning databases whose schema and migrations are already up to date in
+# this process, so further orchestrators for them skip the setup
+_schema_ready: set[str] = set()
+_schema_lock = threading.Lock()
+
 
 def _utc_now() -> datetime:
     """Return current UTC time."""
     return datetime.now(timezone.utc)
 
 
+def _mean(total, count: int, default):
+    """Total divided by count, or default when count is zero."""
+    return total / count if count else default
+
+
+def _int_mean(total: int, count: int) -> int:
+    """Integer average of total over count (0 when count is zero)."""
+    return total // count if count else 0
+
+
 # =============================================================================
 # Learning Database Models
 # =============================================================================
@@ -45,54 +101,77 @@ class FeaturePattern(Base):
     __tablename__ = "feature_patterns"
 
     __table_args__ = (
-        Index("ix_pattern_category", "category"),
         Index("ix_pattern_model", "model_id"),
+        # One row per category (conflict target for _PATTERN_UPSERT); also
+        # serves every lookup by category
+        Index("uq_pattern_category", "category", unique=True),
+        # generate_insights(): enough samples and high difficulty
+        Index("ix_pattern_attempts_difficulty", "total_attempts", "estimated_difficulty"),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
-    category = Column(String(100), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    category = Column(String(100), nullable=False)
 
     # Success tracking
     total_attempts = Column(Integer, nullable=False, default=0)
     successful_attempts = Column(Integer, nullable=False, default=0)
-    avg_attempts_to_success = Column(Float, nullable=False, default=1.0)
+    success_rate = Column(Float, nullable=False, default=0.0)  # Stored on write
+    total_attempts_to_success = Column(Integer, nullable=False, default=0)  # Sum of attempt numbers that succeeded
 
     # Model performance
     model_id = Column(String(100), nullable=True)  # Best performing model
     model_success_rate = Column(Float, nullable=False, default=0.0)
 
-    # Resource patterns
-    avg_input_tokens = Column(Integer, nullable=False, default=0)
-    avg_output_tokens = Column(Integer, nullable=False, default=0)
-    avg_cost = Column(Float, nullable=False, default=0.0)
-    avg_duration_ms = Column(Integer, nullable=False, default=0)
+    # Resource totals (averages are derived from these)
+    total_input_tokens = Column(Integer, nullable=False, default=0)
+    total_output_tokens = Column(Integer, nullable=False, default=0)
+    total_cost = Column(Float, nullable=False, default=0.0)
+    total_duration_ms = Column(Integer, nullable=False, default=0)
 
     # Complexity indicators
-    avg_steps = Column(Float, nullable=False, default=1.0)
+    total_steps = Column(Integer, nullable=False, default=0)
     estimated_difficulty = Column(Float, nullable=False, default=0.5)  # 0-1 scale
 
+    # Bumped on every write, so cached recommendations can be revalidated
+    version = Column(Integer, nullable=False, default=0)
+
     # Timestamps
     created_at = Column(DateTime, nullable=False, default=_utc_now)
     updated_at = Column(DateTime, nullable=False, default=_utc_now, onupdate=_utc_now)
 
+    @property
+    def avg_attempts_to_success(self) -> float:
+        """Average attempt number of successful attempts (1.0 until one succeeds)."""
+        return _mean(self.total_attempts_to_success, self.successful_attempts, 1.0)
+
+    @property
+    def avg_input_tokens(self) -> int:
+        """Average input tokens per attempt."""
+        return _int_mean(self.total_input_tokens, self.total_attempts)
+
+    @property
+    def avg_output_tokens(self) -> int:
+        """Average output tokens per attempt."""
+        return _int_mean(self.total_output_tokens, self.total_attempts)
+
+    @property
+    def avg_cost(self) -> float:
+        """Average cost per attempt."""
+        return _mean(self.total_cost, self.total_attempts, 0.0)
+
+    @property
+    def avg_duration_ms(self) -> int:
+        """Average duration per attempt."""
+        return _int_mean(self.total_duration_ms, self.total_attempts)
+
+    @property
+    def avg_steps(self) -> float:
+        """Average number of steps per attempted feature."""
+        return _mean(self.total_steps, self.total_attempts, 1.0)
+
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            "id": self.id,
-            "category": self.category,
-            "totalAttempts": self.total_attempts,
-            "successfulAttempts": self.successful_attempts,
-            "successRate": round(self.successful_attempts / self.total_attempts * 100, 1) if self.total_attempts > 0 else 0,
-            "avgAttemptsToSuccess": round(self.avg_attempts_to_success, 2),
-            "bestModel": self.model_id,
-            "modelSuccessRate": round(self.model_success_rate * 100, 1),
-            "avgInputTokens": self.avg_input_tokens,
-            "avgOutputTokens": self.avg_output_tokens,
-            "avgCost": round(self.avg_cost, 4),
-            "avgDurationMs": self.avg_duration_ms,
-            "estimatedDifficulty": round(self.estimated_difficulty, 2),
-            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        return _pattern_dict(self)
 
 
 class ModelPerformance(Base):
@@ -108,11 +187,25 @@ class ModelPerformance(Base):
     __tablename__ = "model_performance"
 
     __table_args__ = (
-        Index("ix_perf_model_category", "model_id", "category"),
+        # generate_insights(): each category's models in cost-per-success
+        # order, so the ranking windows need no sort; also the
+        # recommendation's seek to a category
+        Index("ix_perf_category_cost", "category", "cost_per_success"),
+        # One row per (model, category) and one overall row per model. Partial
+        # indexes, because SQLite treats NULL categories as distinct in a
+        # unique index; these are the upsert conflict targets.
+        Index(
+            "uq_perf_model_category", "model_id", "category",
+            unique=True, sqlite_where=text("category IS NOT NULL"),
+        ),
+        Index(
+            "uq_perf_model_overall", "model_id",
+            unique=True, sqlite_where=text("category IS NULL"),
+        ),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
-    model_id = Column(String(100), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    model_id = Column(String(100), nullable=False)
     category = Column(String(100), nullable=True)  # NULL = overall performance
 
     # Performance metrics
@@ -127,26 +220,18 @@ class ModelPerformance(Base):
     cost_per_success = Column(Float, nullable=False, default=0.0)
 
     # Timing
-    avg_duration_ms = Column(Integer, nullable=False, default=0)
+    total_duration_ms = Column(Integer, nullable=False, default=0)
 
     updated_at = Column(DateTime, nullable=False, default=_utc_now, onupdate=_utc_now)
 
+    @property
+    def avg_duration_ms(self) -> int:
+        """Average duration per attempt."""
+        return _int_mean(self.total_duration_ms, self.total_attempts)
+
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            "id": self.id,
-            "modelId": self.model_id,
-            "category": self.category,
-            "totalAttempts": self.total_attempts,
-            "successfulAttempts": self.successful_attempts,
-            "successRate": round(self.success_rate * 100, 1),
-            "totalInputTokens": self.total_input_tokens,
-            "totalOutputTokens": self.total_output_tokens,
-            "totalCost": round(self.total_cost, 4),
-            "costPerSuccess": round(self.cost_per_success, 4),
-            "avgDurationMs": self.avg_duration_ms,
-            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        return _perf_dict(self)
 
 
 class LearningInsight(Base):
@@ -158,7 +243,14 @@ class LearningInsight(Base):
 
     __tablename__ = "learning_insights"
 
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # generate_insights(): categories with a recent insight of a type.
+        # created_at directly follows insight_type so the cutoff is a range
+        # seek; category makes the index covering.
+        Index("ix_insight_type_created", "insight_type", "created_at", "category"),
+    )
+
+    id = Column(Integer, primary_key=True)
     insight_type = Column(String(50), nullable=False)  # model_recommendation, retry_strategy, etc.
     category = Column(String(100), nullable=True)
     title = Column(String(255), nullable=False)
@@ -170,17 +262,740 @@ class LearningInsight(Base):
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            "id": self.id,
-            "insightType": self.insight_type,
-            "category": self.category,
-            "title": self.title,
-            "description": self.description,
-            "confidence": round(self.confidence, 2),
-            "data": self.data,
-            "createdAt": self.created_at.isoformat() if self.created_at else None,
-            "applied": bool(self.applied),
-        }
+        return _insight_dict(self)
+
+
+# =============================================================================
+# Read Paths
+# =============================================================================
+
+# Columns the stats and insight listings select. Rows of these (or model
+# instances) are turned into API dicts by the builders below, so read-only
+# listings never hydrate ORM objects.
+_PATTERN_COLUMNS = (
+    FeaturePattern.id,
+    FeaturePattern.category,
+    FeaturePattern.total_attempts,
+    FeaturePattern.successful_attempts,
+    FeaturePattern.success_rate,
+    FeaturePattern.total_attempts_to_success,
+    FeaturePattern.model_id,
+    FeaturePattern.model_success_rate,
+    FeaturePattern.total_input_tokens,
+    FeaturePattern.total_output_tokens,
+    FeaturePattern.total_cost,
+    FeaturePattern.total_duration_ms,
+    FeaturePattern.estimated_difficulty,
+    FeaturePattern.updated_at,
+)
+
+_PERF_COLUMNS = (
+    ModelPerformance.id,
+    ModelPerformance.model_id,
+    ModelPerformance.category,
+    ModelPerformance.total_attempts,
+    ModelPerformance.successful_attempts,
+    ModelPerformance.success_rate,
+    ModelPerformance.total_input_tokens,
+    ModelPerformance.total_output_tokens,
+    ModelPerformance.total_cost,
+    ModelPerformance.cost_per_success,
+    ModelPerformance.total_duration_ms,
+    ModelPerformance.updated_at,
+)
+
+_INSIGHT_COLUMNS = (
+    LearningInsight.id,
+    LearningInsight.insight_type,
+    LearningInsight.category,
+    LearningInsight.title,
+    LearningInsight.description,
+    LearningInsight.confidence,
+    LearningInsight.data,
+    LearningInsight.created_at,
+    LearningInsight.applied,
+)
+
+
+def _pattern_dict(p) -> dict[str, Any]:
+    """API dict for a FeaturePattern or a row of _PATTERN_COLUMNS."""
+    return {
+        "id": p.id,
+        "category": p.category,
+        "totalAttempts": p.total_attempts,
+        "successfulAttempts": p.successful_attempts,
+        "successRate": round(p.success_rate * 100, 1),
+        "avgAttemptsToSuccess": round(_mean(p.total_attempts_to_success, p.successful_attempts, 1.0), 2),
+        "bestModel": p.model_id,
+        "modelSuccessRate": round(p.model_success_rate * 100, 1),
+        "avgInputTokens": _int_mean(p.total_input_tokens, p.total_attempts),
+        "avgOutputTokens": _int_mean(p.total_output_tokens, p.total_attempts),
+        "avgCost": round(_mean(p.total_cost, p.total_attempts, 0.0), 4),
+        "avgDurationMs": _int_mean(p.total_duration_ms, p.total_attempts),
+        "estimatedDifficulty": round(p.estimated_difficulty, 2),
+        "updatedAt": p.updated_at.isoformat() if p.updated_at else None,
+    }
+
+
+def _perf_dict(p) -> dict[str, Any]:
+    """API dict for a ModelPerformance or a row of _PERF_COLUMNS."""
+    return {
+        "id": p.id,
+        "modelId": p.model_id,
+        "category": p.category,
+        "totalAttempts": p.total_attempts,
+        "successfulAttempts": p.successful_attempts,
+        "successRate": round(p.success_rate * 100, 1),
+        "totalInputTokens": p.total_input_tokens,
+        "totalOutputTokens": p.total_output_tokens,
+        "totalCost": round(p.total_cost, 4),
+        "costPerSuccess": round(p.cost_per_success, 4),
+        "avgDurationMs": _int_mean(p.total_duration_ms, p.total_attempts),
+        "updatedAt": p.updated_at.isoformat() if p.updated_at else None,
+    }
+
+
+def _insight_dict(i) -> dict[str, Any]:
+    """API dict for a LearningInsight or a row of _INSIGHT_COLUMNS."""
+    return {
+        "id": i.id,
+        "insightType": i.insight_type,
+        "category": i.category,
+        "title": i.title,
+        "description": i.description,
+        "confidence": round(i.confidence, 2),
+        "data": i.data,
+        "createdAt": i.created_at.isoformat() if i.created_at else None,
+        "applied": bool(i.applied),
+    }
+
+
+# =============================================================================
+# Database Setup
+# =============================================================================
+
+
+def _json_engine_options() -> dict[str, Any]:
+    """create_engine() options that route JSON columns through orjson, if installed."""
+    if orjson is None:
+        return {}
+    return {
+        "json_serializer": lambda value: orjson.dumps(value).decode(),
+        "json_deserializer": orjson.loads,
+    }
+
+
+def _set_learning_db_pragmas(engine, db_path: Path) -> None:
+    """
+    Tune every new connection for the write-heavy learning workload.
+
+    WAL lets readers run alongside the writer and, with synchronous=NORMAL,
+    only syncs at checkpoints. Network filesystems keep the default
+    rollback journal and sync settings, and skip mmap, since WAL and shared
+    memory aren't reliable there.
+    """
+    is_network = is_network_path(Path(db_path).parent)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-20000")  # ~20MB page cache
+        if not is_network:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
+        cursor.close()
+
+
+def _migrate_add_pattern_success_rate(engine) -> None:
+    """Add the stored success_rate column to feature_patterns and backfill it."""
+    with engine.connect() as conn:
+        result = conn.execute(text("PRAGMA table_info(feature_patterns)"))
+        columns = [row[1] for row in result.fetchall()]
+
+        if "success_rate" not in columns:
+            conn.execute(text("ALTER TABLE feature_patterns ADD COLUMN success_rate FLOAT NOT NULL DEFAULT 0.0"))
+            conn.execute(text(
+                "UPDATE feature_patterns SET success_rate = CAST(successful_attempts AS FLOAT) / total_attempts "
+                "WHERE total_attempts > 0"
+            ))
+            conn.commit()
+
+
+def _migrate_add_pattern_version(engine) -> None:
+    """Add the version counter to feature_patterns."""
+    with engine.connect() as conn:
+        result = conn.execute(text("PRAGMA table_info(feature_patterns)"))
+        columns = [row[1] for row in result.fetchall()]
+
+        if "version" not in columns:
+            conn.execute(text("ALTER TABLE feature_patterns ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+            conn.commit()
+
+
+def _rebuild_table(conn, table: Table, source: str, backfill: dict[str, str]) -> None:
+    """
+    Recreate a table from its current model definition, keeping its rows.
+
+    Used when columns are removed, since older SQLite versions can't drop
+    columns. Follows SQLite's procedure for other schema changes: the rows
+    of source are copied into a new table, which then takes the table's
+    name. Columns present in both layouts are copied; columns named in
+    backfill are filled from SQL expressions over the old rows.
+
+    Must run inside a transaction, so an interrupted rebuild leaves the
+    old table as it was.
+    """
+    name = table.name
+    new_name = f"{name}_new"
+    old_columns = {row[1] for row in conn.execute(text(f'PRAGMA table_info("{source}")'))}
+
+    # Created without indexes: their names are still taken by the old table's
+    conn.execute(text(f'DROP TABLE IF EXISTS "{new_name}"'))
+    conn.execute(CreateTable(table.to_metadata(MetaData(), name=new_name)))
+
+    targets = []
+    sources = []
+    for column in table.columns:
+        if column.name in backfill:
+            targets.append(column.name)
+            sources.append(backfill[column.name])
+        elif column.name in old_columns:
+            targets.append(column.name)
+            sources.append(column.name)
+    conn.execute(text(
+        f'INSERT INTO "{new_name}" ({", ".join(targets)}) SELECT {", ".join(sources)} FROM "{source}"'
+    ))
+
+    conn.execute(text(f'DROP TABLE "{source}"'))
+    conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+    conn.execute(text(f'ALTER TABLE "{new_name}" RENAME TO "{name}"'))
+    for index in table.indexes:
+        index.create(conn)
+
+
+def _averages_source(conn, name: str, marker: str) -> str | None:
+    """
+    Name of the table holding a table's rows in the running-averages layout
+    (identified by its marker column), or None once they are converted.
+
+    Earlier rebuilds renamed the table to {name}_old first, so an
+    interrupted one left the rows there.
+    """
+    for candidate in (f"{name}_old", name):
+        columns = {row[1] for row in conn.execute(text(f'PRAGMA table_info("{candidate}")'))}
+        if marker in columns:
+            return candidate
+    return None
+
+
+def _migrate_averages_to_totals(engine) -> None:
+    """Replace the stored running averages with totals (averages are now derived)."""
+    with engine.connect() as conn:
+        pattern_source = _averages_source(conn, "feature_patterns", "avg_cost")
+        perf_source = _averages_source(conn, "model_performance", "avg_duration_ms")
+        if pattern_source is None and perf_source is None:
+            return
+
+        # Foreign key enforcement can't change inside a transaction, and
+        # legacy_alter_table keeps the renames from rewriting other schema
+        # objects' references to the tables
+        foreign_keys = conn.execute(text("PRAGMA foreign_keys")).scalar()
+        legacy_alter_table = conn.execute(text("PRAGMA legacy_alter_table")).scalar()
+        conn.execute(text("PRAGMA foreign_keys=OFF"))
+        conn.execute(text("PRAGMA legacy_alter_table=ON"))
+        conn.commit()
+        try:
+            with conn.begin():
+                # pysqlite only opens transactions for DML; the rebuilds are
+                # mostly DDL, so begin one explicitly
+                conn.execute(text("BEGIN"))
+                if pattern_source is not None:
+                    _rebuild_table(conn, FeaturePattern.__table__, pattern_source, {
+                        "total_attempts_to_success": (
+                            "CAST(ROUND(avg_attempts_to_success * successful_attempts) AS INTEGER)"
+                        ),
+                        "total_input_tokens": "avg_input_tokens * total_attempts",
+                        "total_output_tokens": "avg_output_tokens * total_attempts",
+                        "total_cost": "avg_cost * total_attempts",
+                        "total_duration_ms": "avg_duration_ms * total_attempts",
+                        "total_steps": "CAST(ROUND(avg_steps * total_attempts) AS INTEGER)",
+                    })
+                if perf_source is not None:
+                    _rebuild_table(conn, ModelPerformance.__table__, perf_source, {
+                        "total_duration_ms": "avg_duration_ms * total_attempts",
+                    })
+        finally:
+            conn.execute(text(f"PRAGMA foreign_keys={int(foreign_keys)}"))
+            conn.execute(text(f"PRAGMA legacy_alter_table={int(legacy_alter_table)}"))
+            conn.commit()
+
+
+# How duplicate rows are merged into the oldest one: counters are summed and
+# stored running averages (older layouts) are weighted by their sample count.
+# Only columns present in the table are touched.
+_MERGED_SUMS = (
+    "total_attempts",
+    "successful_attempts",
+    "total_attempts_to_success",
+    "total_input_tokens",
+    "total_output_tokens",
+    "total_cost",
+    "total_duration_ms",
+    "total_steps",
+)
+_MERGED_AVERAGES = {
+    "avg_attempts_to_success": "successful_attempts",
+    "avg_input_tokens": "total_attempts",
+    "avg_output_tokens": "total_attempts",
+    "avg_cost": "total_attempts",
+    "avg_duration_ms": "total_attempts",
+    "avg_steps": "total_attempts",
+}
+
+
+def _merge_duplicate_rows(conn, table: str, key_columns: tuple[str, ...]) -> int:
+    """
+    Fold rows sharing a key into the oldest one and delete the rest.
+
+    Returns:
+        Number of rows deleted
+    """
+    columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    keys = ", ".join(key_columns)
+    # IS rather than =, so NULL categories (overall rows) match each other
+    same_key = " AND ".join(f"d.{column} IS {table}.{column}" for column in key_columns)
+
+    def merged(expression: str) -> str:
+        return f"(SELECT {expression} FROM {table} AS d WHERE {same_key})"
+
+    attempts = merged("SUM(d.total_attempts)")
+    successes = merged("SUM(d.successful_attempts)")
+    assignments = [f"{column} = {merged(f'SUM(d.{column})')}" for column in _MERGED_SUMS if column in columns]
+    assignments += [
+        f"{column} = COALESCE({merged(f'SUM(d.{column} * d.{weight}) / NULLIF(SUM(d.{weight}), 0)')}, {column})"
+        for column, weight in _MERGED_AVERAGES.items()
+        if column in columns
+    ]
+    if "success_rate" in columns:
+        assignments.append(f"success_rate = COALESCE(CAST({successes} AS FLOAT) / NULLIF({attempts}, 0), 0.0)")
+    if "cost_per_success" in columns:
+        total_cost = merged("SUM(d.total_cost)")
+        assignments.append(
+            f"cost_per_success = CASE WHEN {successes} > 0 THEN {total_cost} / {successes} ELSE {total_cost} END"
+        )
+    assignments.append(f"updated_at = {merged('MAX(d.updated_at)')}")
+
+    # Every SET expression sees the rows as they were before the update
+    survivors = f"SELECT MIN(id) FROM {table} GROUP BY {keys} HAVING COUNT(*) > 1"
+    conn.execute(text(f"UPDATE {table} SET {', '.join(assignments)} WHERE id IN ({survivors})"))
+    return conn.execute(text(
+        f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {keys})"
+    )).rowcount
+
+
+def _migrate_dedupe_learning_rows(engine) -> None:
+    """
+    Merge duplicate pattern/performance rows before their unique indexes are created.
+
+    Duplicates are folded into the oldest row for each key, so their
+    learned statistics are kept. The recording path never creates
+    duplicates, so this only matters for databases edited by hand.
+    """
+    with engine.connect() as conn:
+        existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+        deleted = 0
+        if "uq_pattern_category" not in existing:
+            deleted += _merge_duplicate_rows(conn, "feature_patterns", ("category",))
+        if "uq_perf_model_category" not in existing or "uq_perf_model_overall" not in existing:
+            deleted += _merge_duplicate_rows(conn, "model_performance", ("model_id", "category"))
+
+        if deleted:
+            logger.warning("Merged %d duplicate rows in learning database %s", deleted, engine.url.database)
+        conn.commit()
+
+
+# Indexes replaced by differently shaped ones under new names, or made
+# redundant by another index (or the rowid) on the same columns
+_SUPERSEDED_INDEXES = (
+    "ix_pattern_category",
+    "ix_feature_patterns_category",  # From category's index=True
+    "ix_perf_model_category",  # Same columns as uq_perf_model_category
+    "ix_model_performance_model_id",  # Prefix of both unique indexes
+    # From index=True on the integer primary keys, which are the rowid
+    "ix_feature_patterns_id",
+    "ix_model_performance_id",
+    "ix_learning_insights_id",
+)
+
+
+def _migrate_drop_superseded_indexes(engine) -> None:
+    """Drop indexes that have been replaced, so they stop costing writes."""
+    with engine.connect() as conn:
+        for name in _SUPERSEDED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+        conn.commit()
+
+
+def _migrate_create_missing_indexes(engine) -> None:
+    """Create indexes added to the models after a learning database was created.
+
+    create_all() skips tables that already exist, including their indexes.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _estimated_difficulty(success_rate, successes, attempts_to_success):
+    """
+    SQL expression for a category's difficulty (0-1 scale).
+
+    Based on the success rate and the average attempts needed to succeed,
+    which counts as 1 until something has succeeded.
+    """
+    return 1.0 - (success_rate * 0.7 + case((successes > 0, successes / attempts_to_success), else_=1.0) * 0.3)
+
+
+def _utility_score(success_rate, cost_per_success, cost_weight):
+    """
+    SQL expression ranking a model for a category: success rate balanced
+    with cost efficiency.
+
+    Not stored: each orchestrator ranks with its own configured weight.
+    """
+    return success_rate * (1 - cost_weight) - cost_per_success * cost_weight
+
+
+# =============================================================================
+# Write Statements
+# =============================================================================
+
+# Bind parameter types for the prebuilt statements below and in Read
+# Statements. Each write statement takes one aggregated delta per row, so a
+# flush runs each of them as one executemany no matter how many attempts
+# were buffered. They target the Core tables: the ORM would treat a
+# parameter list as a bulk operation by primary key.
+_PARAM_TYPES = {
+    "category_name": String,
+    "model": String,
+    "attempts": Integer,
+    "successes": Integer,
+    "attempts_to_success": Integer,
+    "input_tokens": Integer,
+    "output_tokens": Integer,
+    "cost": Float,
+    "duration_ms": Integer,
+    "steps": Integer,
+    "cost_weight": Float,
+    "threshold": Integer,
+    "now": DateTime,
+    "insight_type": String,
+    "cutoff": DateTime,
+    "limit": Integer,
+}
+
+
+def _param(name: str):
+    """Typed bind parameter for the prebuilt statements."""
+    return bindparam(name, type_=_PARAM_TYPES[name])
+
+
+def _build_pattern_upsert():
+    """
+    Upsert adding a delta to a category's pattern row.
+
+    The INSERT values are the delta itself; on conflict they are added to
+    the stored totals (excluded.* is the row that would have been inserted).
+    """
+    attempts = _param("attempts")
+    successes = _param("successes")
+    attempts_to_success = _param("attempts_to_success")
+    success_rate = successes / attempts
+    insert = sqlite_insert(FeaturePattern.__table__).values(
+        category=_param("category_name"),
+        total_attempts=attempts,
+        successful_attempts=successes,
+        total_attempts_to_success=attempts_to_success,
+        success_rate=success_rate,
+        total_input_tokens=_param("input_tokens"),
+        total_output_tokens=_param("output_tokens"),
+        total_cost=_param("cost"),
+        total_duration_ms=_param("duration_ms"),
+        total_steps=_param("steps"),
+        estimated_difficulty=_estimated_difficulty(success_rate, successes, attempts_to_success),
+        version=1,
+        created_at=_param("now"),
+        updated_at=_param("now"),
+    )
+    new = insert.excluded
+    attempts = FeaturePattern.total_attempts + new.total_attempts
+    successes = FeaturePattern.successful_attempts + new.successful_attempts
+    attempts_to_success = FeaturePattern.total_attempts_to_success + new.total_attempts_to_success
+    success_rate = successes / attempts
+    return insert.on_conflict_do_update(
+        index_elements=[FeaturePattern.category],
+        set_={
+            "total_attempts": attempts,
+            "successful_attempts": successes,
+            "total_attempts_to_success": attempts_to_success,
+            "success_rate": success_rate,
+            "total_input_tokens": FeaturePattern.total_input_tokens + new.total_input_tokens,
+            "total_output_tokens": FeaturePattern.total_output_tokens + new.total_output_tokens,
+            "total_cost": FeaturePattern.total_cost + new.total_cost,
+            "total_duration_ms": FeaturePattern.total_duration_ms + new.total_duration_ms,
+            "total_steps": FeaturePattern.total_steps + new.total_steps,
+            "estimated_difficulty": _estimated_difficulty(success_rate, successes, attempts_to_success),
+            "version": FeaturePattern.version + 1,
+            "updated_at": new.updated_at,
+        },
+    )
+
+
+def _build_perf_upsert():
+    """Upsert adding a delta to a model's row for one category."""
+    attempts = _param("attempts")
+    successes = _param("successes")
+    cost = _param("cost")
+    insert = sqlite_insert(ModelPerformance.__table__).values(
+        model_id=_param("model"),
+        category=_param("category_name"),
+        total_attempts=attempts,
+        successful_attempts=successes,
+        success_rate=successes / attempts,
+        total_input_tokens=_param("input_tokens"),
+        total_output_tokens=_param("output_tokens"),
+        total_cost=cost,
+        cost_per_success=case((successes > 0, cost / successes), else_=cost),
+        total_duration_ms=_param("duration_ms"),
+        updated_at=_param("now"),
+    )
+    new = insert.excluded
+    attempts = ModelPerformance.total_attempts + new.total_attempts
+    successes = ModelPerformance.successful_attempts + new.successful_attempts
+    total_cost = ModelPerformance.total_cost + new.total_cost
+    return insert.on_conflict_do_update(
+        index_elements=[ModelPerformance.model_id, ModelPerformance.category],
+        index_where=ModelPerformance.category.is_not(None),
+        set_={
+            "total_attempts": attempts,
+            "successful_attempts": successes,
+            "success_rate": successes / attempts,
+            "total_input_tokens": ModelPerformance.total_input_tokens + new.total_input_tokens,
+            "total_output_tokens": ModelPerformance.total_output_tokens + new.total_output_tokens,
+            "total_cost": total_cost,
+            "cost_per_success": case((successes > 0, total_cost / successes), else_=total_cost),
+            "total_duration_ms": ModelPerformance.total_duration_ms + new.total_duration_ms,
+            "updated_at": new.updated_at,
+        },
+    )
+
+
+def _build_overall_upsert():
+    """Upsert adding a delta to a model's overall row (outcomes and cost only)."""
+    attempts = _param("attempts")
+    successes = _param("successes")
+    insert = sqlite_insert(ModelPerformance.__table__).values(
+        model_id=_param("model"),
+        category=None,
+        total_attempts=attempts,
+        successful_attempts=successes,
+        success_rate=successes / attempts,
+        total_cost=_param("cost"),
+        updated_at=_param("now"),
+    )
+    new = insert.excluded
+    attempts = ModelPerformance.total_attempts + new.total_attempts
+    successes = ModelPerformance.successful_attempts + new.successful_attempts
+    return insert.on_conflict_do_update(
+        index_elements=[ModelPerformance.model_id],
+        index_where=ModelPerformance.category.is_(None),
+        set_={
+            "total_attempts": attempts,
+            "successful_attempts": successes,
+            "success_rate": successes / attempts,
+            "total_cost": ModelPerformance.total_cost + new.total_cost,
+            "updated_at": new.updated_at,
+        },
+    )
+
+
+def _build_best_model_update():
+    """
+    Switch a category's best model to the given one.
+
+    Applies once the model has enough samples in the category and beats
+    the current best success rate.
+    """
+    model = _param("model")
+    category = _param("category_name")
+    return (
+        update(FeaturePattern.__table__)
+        .where(
+            FeaturePattern.category == category,
+            exists().where(
+                ModelPerformance.model_id == model,
+                ModelPerformance.category == category,
+                ModelPerformance.total_attempts >= _param("threshold"),
+                ModelPerformance.success_rate > FeaturePattern.model_success_rate,
+            ),
+        )
+        .values(
+            model_id=model,
+            model_success_rate=(
+                select(ModelPerformance.success_rate)
+                .where(ModelPerformance.model_id == model, ModelPerformance.category == category)
+                .scalar_subquery()
+            ),
+            version=FeaturePattern.version + 1,
+            updated_at=_param("now"),
+        )
+    )
+
+
+_PATTERN_UPSERT = _build_pattern_upsert()
+_PERF_UPSERT = _build_perf_upsert()
+_OVERALL_UPSERT = _build_overall_upsert()
+_BEST_MODEL_UPDATE = _build_best_model_update()
+
+
+# Empty pending totals for each kind of row; keys match the statements'
+# bind parameters
+_PATTERN_DELTA = {
+    "attempts": 0,
+    "successes": 0,
+    "attempts_to_success": 0,
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cost": 0.0,
+    "duration_ms": 0,
+    "steps": 0,
+}
+_PERF_DELTA = {
+    "attempts": 0,
+    "successes": 0,
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cost": 0.0,
+    "duration_ms": 0,
+}
+_OVERALL_DELTA = {"attempts": 0, "successes": 0, "cost": 0.0}
+
+
+# =============================================================================
+# Read Statements
+# =============================================================================
+
+# Queries are built once with bind parameters for their per-call values,
+# so every call reuses the same statement and SQLAlchemy's compiled SQL
+# for it instead of constructing and compiling a new one.
+
+
+def _build_opportunities_query():
+    """
+    Categories where the cheapest model (by cost per success) has a similar
+    success rate to the most expensive one at well under half the cost.
+
+    SQLite ranks each category with window functions, pairs its two
+    extremes and applies the test, so only matching categories come back.
+    """
+    # Within a category: ix_perf_category_cost order (ties by rowid)
+    cost_order = (ModelPerformance.cost_per_success, ModelPerformance.id)
+    ranked = (
+        select(
+            ModelPerformance.category,
+            ModelPerformance.model_id,
+            ModelPerformance.success_rate,
+            ModelPerformance.cost_per_success,
+            ModelPerformance.total_attempts,
+            func.row_number().over(
+                partition_by=ModelPerformance.category, order_by=cost_order,
+            ).label("position"),
+            # Same ordering with a whole-partition frame, so both
+            # windows are computed from one pass in index order
+            func.count().over(
+                partition_by=ModelPerformance.category, order_by=cost_order, rows=(None, None),
+            ).label("models"),
+        )
+        .where(
+            ModelPerformance.category.is_not(None),
+            ModelPerformance.total_attempts >= _param("threshold"),
+        )
+        .cte("ranked")
+    )
+    cheapest = ranked.alias("cheapest")
+    priciest = ranked.alias("priciest")
+    return (
+        select(
+            cheapest.c.category,
+            cheapest.c.model_id.label("cheap_model"),
+            cheapest.c.success_rate.label("cheap_success_rate"),
+            cheapest.c.cost_per_success.label("cheap_cost"),
+            priciest.c.model_id.label("pricey_model"),
+            priciest.c.success_rate.label("pricey_success_rate"),
+            priciest.c.cost_per_success.label("pricey_cost"),
+            func.min(cheapest.c.total_attempts, priciest.c.total_attempts).label("min_attempts"),
+        )
+        .join(priciest, priciest.c.category == cheapest.c.category)
+        .where(
+            cheapest.c.position == 1,
+            priciest.c.position == priciest.c.models,
+            priciest.c.models >= 2,
+            cheapest.c.success_rate >= priciest.c.success_rate * 0.9,
+            cheapest.c.cost_per_success < priciest.c.cost_per_success * 0.5,
+        )
+    )
+
+
+_PATTERN_VERSION_QUERY = select(FeaturePattern.version).where(FeaturePattern.category == _param("category_name"))
+_PATTERN_QUERY = select(FeaturePattern).where(FeaturePattern.category == _param("category_name")).limit(1)
+_BEST_MODEL_QUERY = (
+    select(ModelPerformance.model_id)
+    .where(
+        ModelPerformance.category == _param("category_name"),
+        ModelPerformance.total_attempts >= _param("threshold"),
+    )
+    .order_by(
+        _utility_score(ModelPerformance.success_rate, ModelPerformance.cost_per_success, _param("cost_weight")).desc()
+    )
+    .limit(1)
+)
+_INSIGHTS_QUERY = select(*_INSIGHT_COLUMNS).order_by(LearningInsight.created_at.desc()).limit(_param("limit"))
+_STRUGGLING_QUERY = select(
+    FeaturePattern.category,
+    FeaturePattern.success_rate,
+    FeaturePattern.total_attempts,
+    FeaturePattern.successful_attempts,
+    FeaturePattern.total_attempts_to_success,
+).where(
+    FeaturePattern.total_attempts >= _param("threshold"),
+    FeaturePattern.estimated_difficulty > 0.7,
+)
+_OPPORTUNITIES_QUERY = _build_opportunities_query()
+_RECENT_INSIGHT_CATEGORIES_QUERY = select(LearningInsight.category).where(
+    LearningInsight.insight_type == _param("insight_type"),
+    LearningInsight.created_at > _param("cutoff"),
+)
+_CATEGORY_STATS_QUERY = (
+    select(*_PATTERN_COLUMNS)
+    .order_by(FeaturePattern.category)
+    .execution_options(yield_per=STATS_BATCH_SIZE)
+)
+_MODEL_STATS_QUERY = (
+    select(*_PERF_COLUMNS)
+    .where(ModelPerformance.category == _param("category_name"))
+    .order_by(ModelPerformance.success_rate.desc())
+    .execution_options(yield_per=STATS_BATCH_SIZE)
+)
+# Overall stats are the rows with no category
+_OVERALL_MODEL_STATS_QUERY = (
+    select(*_PERF_COLUMNS)
+    .where(ModelPerformance.category.is_(None))
+    .order_by(ModelPerformance.success_rate.desc())
+    .execution_options(yield_per=STATS_BATCH_SIZE)
+)
 
 
 # =============================================================================
@@ -200,6 +1015,44 @@ class FeatureRecommendation:
     reasoning: str
 
 
+@dataclass
+class AttemptRecord:
+    """A single feature implementation attempt, as passed to record_attempts_bulk()."""
+    category: str
+    model_id: str
+    success: bool
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    duration_ms: int = 0
+    attempt_number: int = 1
+    num_steps: int = 1
+
+
+def _validate_attempt(record: AttemptRecord) -> None:
+    """Raise ValueError for an attempt that can't be added to the learning totals."""
+    for name in ("category", "model_id"):
+        value = getattr(record, name)
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"{name} must be a non-empty string, got {value!r}")
+    for name in ("input_tokens", "output_tokens", "cost", "duration_ms", "num_steps"):
+        value = getattr(record, name)
+        if not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            raise ValueError(f"{name} must be a non-negative number, got {value!r}")
+    if not isinstance(record.attempt_number, int) or record.attempt_number < 1:
+        raise ValueError(f"attempt_number must be at least 1, got {record.attempt_number!r}")
+
+
+def _flush_at_exit(flush_ref: weakref.WeakMethod) -> None:
+    """atexit hook: write an orchestrator's buffered attempts if it still exists."""
+    flush = flush_ref()
+    if flush is not None:
+        try:
+            flush()
+        except Exception:
+            logger.exception("Failed to flush learning data at exit")
+
+
 @dataclass
 class OrchestratorConfig:
     """Configuration for the smart orchestrator."""
@@ -209,6 +1062,8 @@ class OrchestratorConfig:
     learning_threshold: int = 5  # Min samples before making recommendations
     cost_weight: float = 0.3  # Weight for cost in optimization (vs success rate)
     auto_optimize: bool = False  # Auto-apply learned optimizations
+    flush_threshold: int = 128  # Buffered attempts that trigger a write (1 = write through)
+    flush_interval: float = 5.0  # Max seconds an attempt stays buffered
 
 
 class SmartOrchestrator:
@@ -233,14 +1088,88 @@ class SmartOrchestrator:
         """
         self.db_path = db_path
         self.config = config or OrchestratorConfig()
-        self.engine = create_engine(f"sqlite:///{db_path}", echo=False)
-        Base.metadata.create_all(self.engine)
+        # One pooled engine per orchestrator (SQLAlchemy uses QueuePool for
+        # file databases); same connect args as the features database
+        self.engine = create_engine(
+            f"sqlite:///{Path(db_path).as_posix()}",
+            echo=False,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": 30,  # Wait up to 30s for locks
+            },
+            # Room for every prebuilt statement's compiled forms
+            query_cache_size=1200,
+            **_json_engine_options(),
+        )
+        _set_learning_db_pragmas(self.engine, db_path)
+        self._ensure_schema()
         self.SessionLocal = sessionmaker(bind=self.engine)
+        # Recent recommendations keyed by (category, num_steps), with the
+        # time they were last checked and their pattern row's version.
+        # Entries are served as-is for _reco_ttl seconds, then revalidated
+        # against the version; they are dropped when this orchestrator
+        # writes to their category. Every write a recommendation depends on
+        # (pattern and model rows alike) goes through the pattern upsert,
+        # which bumps the version; the ranking weight is this instance's own.
+        self._reco_cache: dict[tuple[str, int], tuple[float, int | None, FeatureRecommendation]] = {}
+        self._reco_ttl = 5.0
+        # Attempts recorded but not yet written, as summed deltas per row
+        # (see record_attempt); guarded by _pending_lock
+        self._pending_patterns: dict[str, dict[str, Any]] = {}
+        self._pending_perf: dict[tuple[str, str], dict[str, Any]] = {}
+        self._pending_overall: dict[str, dict[str, Any]] = {}
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._flush_timer: threading.Timer | None = None
+        # Weak, so the hook doesn't keep this orchestrator and its engine
+        # alive; close() unregisters it
+        self._exit_hook = functools.partial(_flush_at_exit, weakref.WeakMethod(self.flush))
+        atexit.register(self._exit_hook)
+
+    def _ensure_schema(self) -> None:
+        """Create tables and run migrations, once per database per process."""
+        key = str(Path(self.db_path).resolve())
+        with _schema_lock:
+            # A database deleted since it was set up needs the schema again
+            if key in _schema_ready and Path(self.db_path).exists():
+                return
+            Base.metadata.create_all(self.engine)
+            _migrate_add_pattern_success_rate(self.engine)
+            _migrate_add_pattern_version(self.engine)
+            _migrate_dedupe_learning_rows(self.engine)
+            _migrate_averages_to_totals(self.engine)
+            _migrate_drop_superseded_indexes(self.engine)
+            _migrate_create_missing_indexes(self.engine)
+            _schema_ready.add(key)
 
     def _get_session(self) -> Session:
         """Get a new database session."""
         return self.SessionLocal()
 
+    def close(self) -> None:
+        """
+        Write any buffered attempts and release the database connections.
+
+        The orchestrator must not be used afterwards.
+        """
+        atexit.unregister(self._exit_hook)
+        try:
+            self.flush()
+        finally:
+            with self._pending_lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            self.engine.dispose()
+
+    def invalidate_cache(self, category: str | None = None) -> None:
+        """Drop cached recommendations for one category, or all of them."""
+        if category is None:
+            self._reco_cache.clear()
+            return
+        for key in [k for k in list(self._reco_cache) if k[0] == category]:
+            self._reco_cache.pop(key, None)
+
     def record_attempt(
         self,
         category: str,
@@ -252,10 +1181,16 @@ class SmartOrchestrator:
         duration_ms: int = 0,
         attempt_number: int = 1,
         num_steps: int = 1,
+        now: datetime | None = None,
     ) -> None:
         """
         Record a feature implementation attempt for learning.
 
+        The attempt is buffered in memory and written with other pending
+        attempts once config.flush_threshold attempts are waiting or
+        config.flush_interval seconds have passed, before any read, or at
+        exit. Call flush() to write it immediately.
+
         Args:
             category: Feature category
             model_id: Model used
@@ -266,78 +1201,251 @@ class SmartOrchestrator:
             duration_ms: Duration in milliseconds
             attempt_number: Which attempt this was (1, 2, 3...)
             num_steps: Number of steps in the feature
+            now: Timestamp for the update (defaults to the current UTC time)
+
+        Raises:
+            ValueError: If category or model_id is empty, a count or cost
+                is negative or not a number, or attempt_number is below 1
         """
-        with self._get_session() as session:
-            # Update feature pattern
-            pattern = session.query(FeaturePattern).filter_by(category=category).first()
-
-            if pattern is None:
-                pattern = FeaturePattern(category=category)
-                session.add(pattern)
-
-            pattern.total_attempts += 1
-            if success:
-                pattern.successful_attempts += 1
-                # Update average attempts to success (running average)
-                if pattern.successful_attempts > 1:
-                    pattern.avg_attempts_to_success = (
-                        pattern.avg_attempts_to_success * (pattern.successful_attempts - 1) + attempt_number
-                    ) / pattern.successful_attempts
-                else:
-                    pattern.avg_attempts_to_success = attempt_number
-
-            # Update resource averages (running average)
-            n = pattern.total_attempts
-            pattern.avg_input_tokens = int((pattern.avg_input_tokens * (n - 1) + input_tokens) / n)
-            pattern.avg_output_tokens = int((pattern.avg_output_tokens * (n - 1) + output_tokens) / n)
-            pattern.avg_cost = (pattern.avg_cost * (n - 1) + cost) / n
-            pattern.avg_duration_ms = int((pattern.avg_duration_ms * (n - 1) + duration_ms) / n)
-            pattern.avg_steps = (pattern.avg_steps * (n - 1) + num_steps) / n
-
-            # Calculate difficulty based on success rate and attempts needed
-            success_rate = pattern.successful_attempts / pattern.total_attempts if pattern.total_attempts > 0 else 0
-            pattern.estimated_difficulty = 1.0 - (success_rate * 0.7 + (1.0 / pattern.avg_attempts_to_success) * 0.3)
-
-            # Update model performance
-            perf = session.query(ModelPerformance).filter_by(model_id=model_id, category=category).first()
-
-            if perf is None:
-                perf = ModelPerformance(model_id=model_id, category=category)
-                session.add(perf)
-
-            perf.total_attempts += 1
-            if success:
-                perf.successful_attempts += 1
-
-            perf.success_rate = perf.successful_attempts / perf.total_attempts
-            perf.total_input_tokens += input_tokens
-            perf.total_output_tokens += output_tokens
-            perf.total_cost += cost
-            perf.cost_per_success = perf.total_cost / perf.successful_attempts if perf.successful_attempts > 0 else perf.total_cost
-            perf.avg_duration_ms = int((perf.avg_duration_ms * (perf.total_attempts - 1) + duration_ms) / perf.total_attempts)
-
-            # Update best model for category if this model is better
-            if perf.total_attempts >= self.config.learning_threshold:
-                current_best_rate = pattern.model_success_rate
-                if perf.success_rate > current_best_rate:
-                    pattern.model_id = model_id
-                    pattern.model_success_rate = perf.success_rate
-
-            # Also update overall model performance (no category filter)
-            overall_perf = session.query(ModelPerformance).filter_by(model_id=model_id, category=None).first()
-
-            if overall_perf is None:
-                overall_perf = ModelPerformance(model_id=model_id, category=None)
-                session.add(overall_perf)
-
-            overall_perf.total_attempts += 1
-            if success:
-                overall_perf.successful_attempts += 1
-            overall_perf.success_rate = overall_perf.successful_attempts / overall_perf.total_attempts
-            overall_perf.total_cost += cost
+        record = AttemptRecord(
+            category=category,
+            model_id=model_id,
+            success=success,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost=cost,
+            duration_ms=duration_ms,
+            attempt_number=attempt_number,
+            num_steps=num_steps,
+        )
+        with self._pending_lock:
+            self._buffer_attempt(record, now or _utc_now())
+            if self._pending_count >= self.config.flush_threshold:
+                self._flush_or_keep_locked()
+            self._start_flush_timer_locked()
+
+    def record_attempts_bulk(self, records: list[AttemptRecord], now: datetime | None = None) -> None:
+        """
+        Record several feature implementation attempts and write them now.
+
+        Any attempts still buffered by record_attempt() are written in the
+        same transaction. If the database is locked or unavailable, the
+        attempts stay buffered for the next flush (see flush()).
+
+        Args:
+            records: Attempts to record
+            now: Timestamp for the update (defaults to the current UTC time)
+
+        Raises:
+            ValueError: If any record is invalid (see record_attempt); none
+                of the batch is recorded then
+        """
+        if not records:
+            return
+        for record in records:
+            _validate_attempt(record)
+
+        # One timestamp for every row touched by this batch
+        if now is None:
+            now = _utc_now()
+
+        with self._pending_lock:
+            for record in records:
+                self._buffer_attempt(record, now)
+            self._flush_or_keep_locked()
+            self._start_flush_timer_locked()
+
+    def flush(self) -> int:
+        """
+        Write all buffered attempts to the database in one transaction.
+
+        Returns:
+            Number of attempts written
+        """
+        if not self._pending_count:
+            return 0
+        with self._pending_lock:
+            return self._flush_locked()
+
+    def _flush_from_timer(self) -> None:
+        """Flush from the interval timer thread, logging failures."""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush learning data to %s", self.db_path)
+
+    def _buffer_attempt(self, record: AttemptRecord, now: datetime) -> None:
+        """Add one attempt to the pending deltas (caller holds _pending_lock)."""
+        # Everything that can fail happens before the buffers change, so
+        # the pattern, perf and overall deltas always count the same attempts
+        _validate_attempt(record)
+        category = record.category
+        model_id = record.model_id
+        input_tokens = record.input_tokens
+        output_tokens = record.output_tokens
+        cost = record.cost
+        duration_ms = record.duration_ms
+
+        pattern = self._pending_patterns.get(category)
+        if pattern is None:
+            pattern = self._pending_patterns[category] = dict(_PATTERN_DELTA)
+        perf = self._pending_perf.get((model_id, category))
+        if perf is None:
+            perf = self._pending_perf[(model_id, category)] = dict(_PERF_DELTA)
+        overall = self._pending_overall.get(model_id)
+        if overall is None:
+            overall = self._pending_overall[model_id] = dict(_OVERALL_DELTA)
+
+        pattern["attempts"] += 1
+        pattern["input_tokens"] += input_tokens
+        pattern["output_tokens"] += output_tokens
+        pattern["cost"] += cost
+        pattern["duration_ms"] += duration_ms
+        pattern["steps"] += record.num_steps
+        pattern["now"] = now
+
+        perf["attempts"] += 1
+        perf["input_tokens"] += input_tokens
+        perf["output_tokens"] += output_tokens
+        perf["cost"] += cost
+        perf["duration_ms"] += duration_ms
+        perf["now"] = now
+
+        overall["attempts"] += 1
+        overall["cost"] += cost
+        overall["now"] = now
+
+        # Most attempts fail; only successes touch the success counters
+        if record.success:
+            pattern["successes"] += 1
+            pattern["attempts_to_success"] += record.attempt_number
+            perf["successes"] += 1
+            overall["successes"] += 1
+
+        self._pending_count += 1
+
+    def _start_flush_timer_locked(self) -> None:
+        """Schedule a flush for attempts left pending (caller holds _pending_lock)."""
+        if self._pending_count and self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.config.flush_interval, self._flush_from_timer)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_or_keep_locked(self) -> None:
+        """
+        Flush after buffering attempts, keeping them pending if the database
+        is locked or unavailable (caller holds _pending_lock).
 
+        The attempts are recorded once buffered: raising would invite the
+        caller to record them again, counting them twice.
+        """
+        try:
+            self._flush_locked()
+        except OperationalError:
+            logger.warning(
+                "Failed to write learning data to %s, keeping %d attempts buffered",
+                self.db_path, self._pending_count, exc_info=True,
+            )
+
+    def _flush_locked(self) -> int:
+        """Write the pending deltas (caller holds _pending_lock)."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        count = self._pending_count
+        if not count:
+            return 0
+
+        categories = list(self._pending_patterns)
+        try:
+            self._write_deltas(self._pending_patterns, self._pending_perf, self._pending_overall)
+        except OperationalError:
+            # Locked or unavailable database: keep everything for the next flush
+            raise
+        except SQLAlchemyError:
+            logger.exception("Failed to write learning data to %s, retrying row by row", self.db_path)
+            count -= self._write_deltas_separately()
+
+        # Only dropped once written, so a failed flush keeps the attempts
+        self._pending_patterns.clear()
+        self._pending_perf.clear()
+        self._pending_overall.clear()
+        self._pending_count = 0
+
+        for category in categories:
+            self.invalidate_cache(category)
+        return count
+
+    def _write_deltas(
+        self,
+        patterns: dict[str, dict[str, Any]],
+        perf: dict[tuple[str, str], dict[str, Any]],
+        overall: dict[str, dict[str, Any]],
+    ) -> None:
+        """Apply pending deltas to the database in one transaction."""
+        threshold = self.config.learning_threshold
+        pattern_params = [{"category_name": category, **totals} for category, totals in patterns.items()]
+        perf_params = [
+            {"model": model_id, "category_name": category, **totals}
+            for (model_id, category), totals in perf.items()
+        ]
+        overall_params = [{"model": model_id, **totals} for model_id, totals in overall.items()]
+        # The best-model check runs once per touched (model, category),
+        # against the totals after this flush
+        best_params = [
+            {"model": model_id, "category_name": category, "threshold": threshold, "now": totals["now"]}
+            for (model_id, category), totals in perf.items()
+        ]
+
+        with self._get_session() as session:
+            for stmt, params in (
+                (_PATTERN_UPSERT, pattern_params),
+                (_PERF_UPSERT, perf_params),
+                (_BEST_MODEL_UPDATE, best_params),
+                (_OVERALL_UPSERT, overall_params),
+            ):
+                if params:
+                    session.execute(stmt, params)
             session.commit()
 
+    def _write_deltas_separately(self) -> int:
+        """
+        Write pending deltas one category (and one overall row) at a time
+        after a batch failed, dropping those the database rejects
+        (caller holds _pending_lock).
+
+        Each part leaves the buffers once written or dropped, so a database
+        error that interrupts this keeps only the unwritten parts pending.
+
+        Returns:
+            Number of attempts dropped
+        """
+        dropped = 0
+        for category in list(self._pending_patterns):
+            pattern = {category: self._pending_patterns[category]}
+            perf = {key: totals for key, totals in self._pending_perf.items() if key[1] == category}
+            try:
+                self._write_deltas(pattern, perf, {})
+            except OperationalError:
+                raise
+            except SQLAlchemyError:
+                logger.exception("Dropping %d learning attempts for category %r", pattern[category]["attempts"], category)
+                dropped += pattern[category]["attempts"]
+            del self._pending_patterns[category]
+            for key in perf:
+                del self._pending_perf[key]
+
+        for model_id in list(self._pending_overall):
+            try:
+                self._write_deltas({}, {}, {model_id: self._pending_overall[model_id]})
+            except OperationalError:
+                raise
+            except SQLAlchemyError:
+                logger.exception("Dropping overall learning totals for model %r", model_id)
+            del self._pending_overall[model_id]
+        return dropped
+
     def get_recommendation(self, category: str, num_steps: int = 1) -> FeatureRecommendation:
         """
         Get a recommendation for implementing a feature.
@@ -349,54 +1457,68 @@ class SmartOrchestrator:
         Returns:
             FeatureRecommendation with model and strategy suggestions
         """
+        self.flush()
+        key = (category, num_steps)
+        checked_at = time.monotonic()
+        cached = self._reco_cache.get(key)
+        if cached is not None and checked_at - cached[0] < self._reco_ttl:
+            return cached[2]
+
         with self._get_session() as session:
-            pattern = session.query(FeaturePattern).filter_by(category=category).first()
-
-            if pattern is None or pattern.total_attempts < self.config.learning_threshold:
-                # Not enough data, use defaults
-                return FeatureRecommendation(
-                    recommended_model=self.config.default_model,
-                    expected_attempts=1,
-                    estimated_cost=0.0,
-                    estimated_duration_ms=0,
-                    difficulty=0.5,
-                    confidence=0.0,
-                    reasoning="Insufficient data for category-specific recommendation",
-                )
-
-            # Find best model for this category
-            best_perf = (
-                session.query(ModelPerformance)
-                .filter(
-                    ModelPerformance.category == category,
-                    ModelPerformance.total_attempts >= self.config.learning_threshold,
-                )
-                .order_by(
-                    # Balance success rate with cost efficiency
-                    (ModelPerformance.success_rate * (1 - self.config.cost_weight)
-                     - ModelPerformance.cost_per_success * self.config.cost_weight).desc()
-                )
-                .first()
-            )
+            # Past the TTL, a cached recommendation is still valid if the
+            # category's row hasn't been written since (by any process)
+            version = session.scalar(_PATTERN_VERSION_QUERY, {"category_name": category})
+            if cached is not None and cached[1] == version:
+                recommendation = cached[2]
+            else:
+                recommendation = self._compute_recommendation(session, category, num_steps)
 
-            recommended_model = best_perf.model_id if best_perf else self.config.default_model
-            confidence = min(pattern.total_attempts / 50, 1.0)  # Max confidence at 50 samples
+        self._reco_cache[key] = (checked_at, version, recommendation)
+        return recommendation
 
-            # Scale estimates based on step count
-            step_factor = num_steps / pattern.avg_steps if pattern.avg_steps > 0 else 1.0
+    def _compute_recommendation(self, session: Session, category: str, num_steps: int) -> FeatureRecommendation:
+        """Build a recommendation from the database (uncached)."""
+        threshold = self.config.learning_threshold
+        default_model = self.config.default_model
+        cost_weight = self.config.cost_weight
+        pattern = session.scalars(_PATTERN_QUERY, {"category_name": category}).first()
 
+        if pattern is None or pattern.total_attempts < threshold:
+            # Not enough data, use defaults
             return FeatureRecommendation(
-                recommended_model=recommended_model,
-                expected_attempts=max(1, round(pattern.avg_attempts_to_success)),
-                estimated_cost=pattern.avg_cost * step_factor,
-                estimated_duration_ms=int(pattern.avg_duration_ms * step_factor),
-                difficulty=pattern.estimated_difficulty,
-                confidence=confidence,
-                reasoning=f"Based on {pattern.total_attempts} attempts in '{category}' category "
-                         f"({pattern.successful_attempts} successful, "
-                         f"{round(pattern.successful_attempts/pattern.total_attempts*100, 1)}% success rate)",
+                recommended_model=default_model,
+                expected_attempts=1,
+                estimated_cost=0.0,
+                estimated_duration_ms=0,
+                difficulty=0.5,
+                confidence=0.0,
+                reasoning="Insufficient data for category-specific recommendation",
             )
 
+        # Find best model for this category
+        best_model = session.scalar(
+            _BEST_MODEL_QUERY,
+            {"category_name": category, "threshold": threshold, "cost_weight": cost_weight},
+        )
+
+        recommended_model = best_model or default_model
+        confidence = min(pattern.total_attempts / 50, 1.0)  # Max confidence at 50 samples
+
+        # Scale estimates based on step count
+        step_factor = num_steps / pattern.avg_steps if pattern.avg_steps > 0 else 1.0
+
+        return FeatureRecommendation(
+            recommended_model=recommended_model,
+            expected_attempts=max(1, round(pattern.avg_attempts_to_success)),
+            estimated_cost=pattern.avg_cost * step_factor,
+            estimated_duration_ms=int(pattern.avg_duration_ms * step_factor),
+            difficulty=pattern.estimated_difficulty,
+            confidence=confidence,
+            reasoning=f"Based on {pattern.total_attempts} attempts in '{category}' category "
+                     f"({pattern.successful_attempts} successful, "
+                     f"{round(pattern.success_rate * 100, 1)}% success rate)",
+        )
+
     def get_insights(self, limit: int = 10) -> list[dict[str, Any]]:
         """
         Get recent learning insights.
@@ -405,13 +1527,7 @@ class SmartOrchestrator:
             List of insight dictionaries
         """
         with self._get_session() as session:
-            insights = (
-                session.query(LearningInsight)
-                .order_by(LearningInsight.created_at.desc())
-                .limit(limit)
-                .all()
-            )
-            return [i.to_dict() for i in insights]
+            return [_insight_dict(row) for row in session.execute(_INSIGHTS_QUERY, {"limit": limit})]
 
     def generate_insights(self) -> list[LearningInsight]:
         """
@@ -420,114 +1536,79 @@ class SmartOrchestrator:
         Returns:
             List of newly generated insights
         """
+        self.flush()
+        # Shared by both scans
+        params = {"threshold": self.config.learning_threshold}
         new_insights = []
+        now = _utc_now()
+        recent_cutoff = now - timedelta(days=7)
 
         with self._get_session() as session:
             # Find categories with consistently high failure rates
-            struggling_categories = (
-                session.query(FeaturePattern)
-                .filter(
-                    FeaturePattern.total_attempts >= self.config.learning_threshold,
-                    FeaturePattern.estimated_difficulty > 0.7,
-                )
-                .all()
-            )
+            struggling_categories = session.execute(_STRUGGLING_QUERY, params).all()
 
-            for pattern in struggling_categories:
-                # Check if we already have a recent insight for this
-                existing = (
-                    session.query(LearningInsight)
-                    .filter(
-                        LearningInsight.insight_type == "high_difficulty",
-                        LearningInsight.category == pattern.category,
-                        LearningInsight.created_at > _utc_now() - timedelta(days=7),
-                    )
-                    .first()
-                )
+            # Skip categories that already have a recent insight of the same type
+            recent_difficulty = self._recent_insight_categories(session, "high_difficulty", recent_cutoff)
 
-                if not existing:
-                    success_rate = pattern.successful_attempts / pattern.total_attempts * 100
+            for pattern in struggling_categories:
+                if pattern.category not in recent_difficulty:
+                    success_rate = pattern.success_rate * 100
+                    avg_attempts = _mean(pattern.total_attempts_to_success, pattern.successful_attempts, 1.0)
                     insight = LearningInsight(
                         insight_type="high_difficulty",
                         category=pattern.category,
                         title=f"High difficulty category: {pattern.category}",
                         description=f"Features in '{pattern.category}' have a {success_rate:.0f}% success rate "
-                                   f"and require an average of {pattern.avg_attempts_to_success:.1f} attempts. "
+                                   f"and require an average of {avg_attempts:.1f} attempts. "
                                    f"Consider breaking down these features into smaller tasks.",
                         confidence=min(pattern.total_attempts / 50, 1.0),
                         data={
                             "successRate": success_rate,
-                            "avgAttempts": pattern.avg_attempts_to_success,
+                            "avgAttempts": avg_attempts,
                             "totalAttempts": pattern.total_attempts,
                         },
+                        created_at=now,
                     )
                     session.add(insight)
                     new_insights.append(insight)
 
-            # Find model efficiency opportunities
-            performances = (
-                session.query(ModelPerformance)
-                .filter(
-                    ModelPerformance.category.is_not(None),
-                    ModelPerformance.total_attempts >= self.config.learning_threshold,
-                )
-                .all()
-            )
+            # Find model efficiency opportunities (see _build_opportunities_query)
+            opportunities = session.execute(_OPPORTUNITIES_QUERY, params).all()
 
-            # Group by category and find if there's a cheaper model with similar success
-            category_perfs: dict[str, list[ModelPerformance]] = {}
-            for p in performances:
-                if p.category not in category_perfs:
-                    category_perfs[p.category] = []
-                category_perfs[p.category].append(p)
-
-            for category, perfs in category_perfs.items():
-                if len(perfs) < 2:
-                    continue
-
-                # Sort by cost per success
-                sorted_perfs = sorted(perfs, key=lambda x: x.cost_per_success)
-                cheapest = sorted_perfs[0]
-                most_expensive = sorted_perfs[-1]
-
-                # If cheapest has similar success rate but much lower cost
-                if (
-                    cheapest.success_rate >= most_expensive.success_rate * 0.9
-                    and cheapest.cost_per_success < most_expensive.cost_per_success * 0.5
-                ):
-                    existing = (
-                        session.query(LearningInsight)
-                        .filter(
-                            LearningInsight.insight_type == "cost_optimization",
-                            LearningInsight.category == category,
-                            LearningInsight.created_at > _utc_now() - timedelta(days=7),
-                        )
-                        .first()
-                    )
+            recent_cost = self._recent_insight_categories(session, "cost_optimization", recent_cutoff)
 
-                    if not existing:
-                        savings = (most_expensive.cost_per_success - cheapest.cost_per_success) / most_expensive.cost_per_success * 100
-                        insight = LearningInsight(
-                            insight_type="cost_optimization",
-                            category=category,
-                            title=f"Cost optimization for {category}",
-                            description=f"Using {cheapest.model_id} instead of {most_expensive.model_id} "
-                                       f"for '{category}' features could save ~{savings:.0f}% "
-                                       f"with similar success rate ({cheapest.success_rate*100:.0f}% vs {most_expensive.success_rate*100:.0f}%).",
-                            confidence=min(min(cheapest.total_attempts, most_expensive.total_attempts) / 50, 1.0),
-                            data={
-                                "cheaperModel": cheapest.model_id,
-                                "expensiveModel": most_expensive.model_id,
-                                "savingsPercent": savings,
-                            },
-                        )
-                        session.add(insight)
-                        new_insights.append(insight)
+            for row in opportunities:
+                category = row.category
+                if category not in recent_cost:
+                    savings = (row.pricey_cost - row.cheap_cost) / row.pricey_cost * 100
+                    insight = LearningInsight(
+                        insight_type="cost_optimization",
+                        category=category,
+                        title=f"Cost optimization for {category}",
+                        description=f"Using {row.cheap_model} instead of {row.pricey_model} "
+                                   f"for '{category}' features could save ~{savings:.0f}% "
+                                   f"with similar success rate ({row.cheap_success_rate*100:.0f}% vs {row.pricey_success_rate*100:.0f}%).",
+                        confidence=min(row.min_attempts / 50, 1.0),
+                        data={
+                            "cheaperModel": row.cheap_model,
+                            "expensiveModel": row.pricey_model,
+                            "savingsPercent": savings,
+                        },
+                        created_at=now,
+                    )
+                    session.add(insight)
+                    new_insights.append(insight)
 
             session.commit()
 
         return new_insights
 
+    @staticmethod
+    def _recent_insight_categories(session: Session, insight_type: str, cutoff: datetime) -> set[str]:
+        """Categories with an insight of the given type created after cutoff."""
+        params = {"insight_type": insight_type, "cutoff": cutoff}
+        return set(session.scalars(_RECENT_INSIGHT_CATEGORIES_QUERY, params))
+
     def get_category_stats(self) -> list[dict[str, Any]]:
         """
         Get statistics for all categories.
@@ -535,9 +1616,22 @@ class SmartOrchestrator:
         Returns:
             List of category statistics
         """
+        return list(self.iter_category_stats())
+
+    def iter_category_stats(self) -> Iterator[dict[str, Any]]:
+        """
+        Stream statistics for all categories, ordered by category.
+
+        Rows are fetched STATS_BATCH_SIZE at a time; the read stays open
+        until the iterator is exhausted or closed.
+
+        Yields:
+            Category statistics dictionaries
+        """
+        self.flush()
         with self._get_session() as session:
-            patterns = session.query(FeaturePattern).order_by(FeaturePattern.category).all()
-            return [p.to_dict() for p in patterns]
+            for row in session.execute(_CATEGORY_STATS_QUERY):
+                yield _pattern_dict(row)
 
     def get_model_stats(self, category: str | None = None) -> list[dict[str, Any]]:
         """
@@ -549,29 +1643,46 @@ class SmartOrchestrator:
         Returns:
             List of model performance stats
         """
-        with self._get_session() as session:
-            query = session.query(ModelPerformance)
+        return list(self.iter_model_stats(category))
 
-            if category is not None:
-                query = query.filter(ModelPerformance.category == category)
-            else:
-                # Get overall stats (no category)
-                query = query.filter(ModelPerformance.category.is_(None))
+    def iter_model_stats(self, category: str | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Stream model performance statistics, best success rate first.
+
+        Rows are fetched STATS_BATCH_SIZE at a time; the read stays open
+        until the iterator is exhausted or closed.
+
+        Args:
+            category: Optional category filter (overall stats when omitted)
+
+        Yields:
+            Model performance stats dictionaries
+        """
+        self.flush()
+        if category is not None:
+            stmt, params = _MODEL_STATS_QUERY, {"category_name": category}
+        else:
+            # Get overall stats (no category)
+            stmt, params = _OVERALL_MODEL_STATS_QUERY, {}
 
-            performances = query.order_by(ModelPerformance.success_rate.desc()).all()
-            return [p.to_dict() for p in performances]
+        with self._get_session() as session:
+            for row in session.execute(stmt, params):
+                yield _perf_dict(row)
 
 
 # =============================================================================
 # Global Instance
 # =============================================================================
 
+# Orchestrators per learning database. Lookups are plain dict reads; the
+# lock only serializes construction so a database is set up once.
 _orchestrators: dict[str, SmartOrchestrator] = {}
+_orchestrators_lock = threading.Lock()
 
 
 def get_smart_orchestrator(project_path: Path, config: OrchestratorConfig | None = None) -> SmartOrchestrator:
     """
-    Get or create a SmartOrchestrator for a project.
+    Get or create a SmartOrchestrator for a project (thread-safe).
 
     Args:
         project_path: Path to the project directory
@@ -581,10 +1692,17 @@ def get_smart_orchestrator(project_path: Path, config: OrchestratorConfig | None
         SmartOrchestrator instance
     """
     db_path = project_path / ".autocoder" / "learning.db"
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-
     path_str = str(db_path)
-    if path_str not in _orchestrators:
-        _orchestrators[path_str] = SmartOrchestrator(db_path, config)
 
-    return _orchestrators[path_str]
+    orchestrator = _orchestrators.get(path_str)
+    if orchestrator is not None:
+        return orchestrator
+
+    with _orchestrators_lock:
+        orchestrator = _orchestrators.get(path_str)
+        if orchestrator is None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            orchestrator = SmartOrchestrator(db_path, config)
+            _orchestrators[path_str] = orchestrator
+
+    return orchestrator
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Parallel Orchestrator Tests
+===========================
+
+Tests for scheduling the doc-admin agent in parallel_orchestrator.
+Run with: python test_parallel_orchestrator.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import parallel_orchestrator
+from parallel_orchestrator import ParallelOrchestrator
+
+
+class TestDocAdminSpawn(unittest.TestCase):
+    """Tests for skipping doc-admin runs when HEAD hasn't moved."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.orchestrator = ParallelOrchestrator(Path(tmp.name))
+        self.addCleanup(self.orchestrator._engine.dispose)
+
+        self.head = "a" * 40
+        self.returncode = 0
+        self.popen = self._patch(mock.patch("parallel_orchestrator.subprocess.Popen", side_effect=self._fake_popen))
+        self._patch(mock.patch.object(self.orchestrator, "_get_project_head", side_effect=lambda: self.head))
+        # The output reader runs to completion before the spawn returns
+        self._patch(mock.patch("parallel_orchestrator.threading.Thread", side_effect=self._run_now))
+        self._patch(mock.patch.object(parallel_orchestrator.debug_log, "log"))
+        self._patch(mock.patch("builtins.print"))
+
+    def _patch(self, patcher):
+        """Start a patcher for the rest of the test."""
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _fake_popen(self, cmd, **kwargs):
+        return mock.Mock(stdout=[], returncode=self.returncode)
+
+    @staticmethod
+    def _run_now(target, daemon=False):
+        return mock.Mock(start=target)
+
+    def test_unchanged_head_is_skipped(self):
+        self.assertTrue(self.orchestrator._spawn_doc_admin_agent()[0])
+        self.assertFalse(self.orchestrator._spawn_doc_admin_agent()[0])
+        self.assertEqual(self.popen.call_count, 1)
+
+    def test_new_commit_runs_again(self):
+        self.orchestrator._spawn_doc_admin_agent()
+        self.head = "b" * 40
+        self.assertTrue(self.orchestrator._spawn_doc_admin_agent()[0])
+        self.assertEqual(self.popen.call_count, 2)
+
+    def test_manual_run_is_forced(self):
+        self.orchestrator._spawn_doc_admin_agent()
+        self.assertTrue(self.orchestrator.run_doc_admin()[0])
+        self.assertEqual(self.popen.call_count, 2)
+
+    def test_failed_run_is_retried_at_same_head(self):
+        self.returncode = 1
+        self.orchestrator._spawn_doc_admin_agent()
+        self.assertTrue(self.orchestrator._spawn_doc_admin_agent()[0])
+        self.assertEqual(self.popen.call_count, 2)
+
+    def test_unknown_head_is_not_skipped(self):
+        self.head = None
+        self.orchestrator._spawn_doc_admin_agent()
+        self.assertTrue(self.orchestrator._spawn_doc_admin_agent()[0])
+        self.assertEqual(self.popen.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Path Management Tests
+=====================
+
+Tests for the .autocoder path helpers and legacy path migration.
+Run with: python test_paths.py
+"""
+
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from paths import get_autocoder_dir, get_database_path, get_prompts_dir, migrate_legacy_paths
+
+
+def create_features_db(path: Path, *names: str) -> None:
+    """Create a features database holding the named features."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE features (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO features (name) VALUES (?)", [(name,) for name in names])
+    conn.close()
+
+
+def feature_names(path: Path) -> list[str]:
+    with sqlite3.connect(path) as conn:
+        names = [row[0] for row in conn.execute("SELECT name FROM features ORDER BY id")]
+    conn.close()
+    return names
+
+
+class TestDirectories(unittest.TestCase):
+    """Tests for the directory helpers."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.project = Path(tmp.name)
+
+    def test_directories_are_created(self):
+        prompts_dir = get_prompts_dir(self.project)
+        self.assertEqual(prompts_dir, self.project / ".autocoder" / "prompts")
+        self.assertTrue(prompts_dir.is_dir())
+
+    def test_deleted_directories_are_created_again(self):
+        get_prompts_dir(self.project)
+        shutil.rmtree(get_autocoder_dir(self.project))
+
+        self.assertTrue(get_prompts_dir(self.project).is_dir())
+
+        # As a full reset of the project does
+        shutil.rmtree(get_prompts_dir(self.project))
+        self.assertTrue(get_prompts_dir(self.project).is_dir())
+
+
+class TestMigrateLegacyDatabase(unittest.TestCase):
+    """Tests for moving a project-root features.db into .autocoder/."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.project = Path(tmp.name)
+        create_features_db(self.project / "features.db", "legacy")
+
+    def test_legacy_database_replaces_empty_one(self):
+        create_features_db(get_database_path(self.project))
+
+        migrate_legacy_paths(self.project)
+        self.assertEqual(feature_names(get_database_path(self.project)), ["legacy"])
+
+    def test_database_with_features_is_kept(self):
+        create_features_db(get_database_path(self.project), "current")
+
+        migrate_legacy_paths(self.project)
+        self.assertEqual(feature_names(get_database_path(self.project)), ["current"])
+
+    def test_unreadable_database_is_kept(self):
+        new_db = get_database_path(self.project)
+        new_db.write_bytes(b"not a database" * 100)
+
+        migrate_legacy_paths(self.project)
+        self.assertEqual(new_db.read_bytes(), b"not a database" * 100)
+
+    def test_probe_leaves_no_files_next_to_legacy_database(self):
+        migrate_legacy_paths(self.project)
+        self.assertEqual(sorted(p.name for p in self.project.glob("features.db*")), ["features.db"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Settings Tests
+==============
+
+Tests for the settings files and the v2 settings router.
+Run with: python test_settings.py
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import settings
+from server.routers import settings_v2
+from settings import PROJECT_SETTINGS_FILE, AppSettings
+
+
+class SettingsTestCase(unittest.TestCase):
+    """Base for tests with a temporary home directory and project."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.home = Path(tmp.name) / "home"
+        self.home.mkdir()
+        self.project = Path(tmp.name) / "project"
+        self.project.mkdir()
+
+        home_env = mock.patch.dict(os.environ, {"HOME": str(self.home), "USERPROFILE": str(self.home)})
+        home_env.start()
+        self.addCleanup(home_env.stop)
+
+        # Caches are per process; start each test from a cold one
+        settings._file_cache.clear()
+        settings_v2._response_cache.clear()
+
+    def write_app_settings(self, data: dict) -> Path:
+        """Write the app settings file directly, as a text editor would."""
+        path = AppSettings().settings_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return path
+
+
+class TestSettingsFileCache(SettingsTestCase):
+    """Tests for reusing parsed settings files."""
+
+    def test_unchanged_file_is_parsed_once(self):
+        self.write_app_settings({"theme": "dark"})
+        with mock.patch("settings.json.load", wraps=json.load) as load:
+            AppSettings().load()
+            app = AppSettings()
+            app.load()
+
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(app.get("theme"), "dark")
+
+    def test_loaded_settings_are_copies(self):
+        self.write_app_settings({"theme": "dark"})
+        app = AppSettings()
+        app.load()
+        app.set("theme", "lite")
+
+        other = AppSettings()
+        other.load()
+        self.assertEqual(other.get("theme"), "dark")
+
+    def test_external_edit_is_seen(self):
+        self.write_app_settings({"theme": "dark"})
+        app = AppSettings()
+        app.load()
+
+        self.write_app_settings({"theme": "dark", "darkMode": True})
+        app.load()
+        self.assertEqual(app.settings, {"theme": "dark", "darkMode": True})
+
+    def test_deleted_file_loads_empty(self):
+        path = self.write_app_settings({"theme": "dark"})
+        app = AppSettings()
+        app.load()
+
+        path.unlink()
+        app.load()
+        self.assertEqual(app.settings, {})
+
+    def test_same_size_rewrite_with_same_mtime_is_seen(self):
+        path = self.write_app_settings({"theme": "dark"})
+        app = AppSettings()
+        app.load()
+        mtime_ns = path.stat().st_mtime_ns
+
+        # Replaced the way saves do it, on a filesystem with coarse mtimes
+        tmp_path = path.with_name("settings.json.tmp")
+        tmp_path.write_text(json.dumps({"theme": "lite"}), encoding="utf-8")
+        os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, path)
+
+        app.load()
+        self.assertEqual(app.get("theme"), "lite")
+
+
+class TestWriteSettingsFile(SettingsTestCase):
+    """Tests for saving settings files."""
+
+    def _leftover_files(self):
+        return sorted(p.name for p in AppSettings().settings_file.parent.iterdir() if p.name != "settings.json")
+
+    def test_save_replaces_file_without_leftovers(self):
+        path = self.write_app_settings({"theme": "dark"})
+        inode = path.stat().st_ino
+
+        app = AppSettings()
+        app.load()
+        app.set("theme", "lite")
+        app.save()
+
+        self.assertEqual(json.loads(path.read_text(encoding="utf-8")), {"theme": "lite"})
+        self.assertNotEqual(path.stat().st_ino, inode)
+        self.assertEqual(self._leftover_files(), [])
+
+    def test_unchanged_settings_are_not_rewritten(self):
+        app = AppSettings()
+        app.set("theme", "dark")
+        app.save()
+        stamp = settings.settings_file_stamp(app.settings_file)
+
+        self.assertFalse(settings._write_settings_file(app.settings_file, {"theme": "dark"}))
+        self.assertEqual(settings.settings_file_stamp(app.settings_file), stamp)
+        self.assertTrue(settings._write_settings_file(app.settings_file, {"theme": "lite"}))
+
+    def test_externally_edited_file_is_rewritten(self):
+        app = AppSettings()
+        app.set("theme", "dark")
+        app.save()
+
+        # The cache still holds what was saved, but the file no longer does
+        self.write_app_settings({"theme": "lite"})
+        self.assertTrue(settings._write_settings_file(app.settings_file, {"theme": "dark"}))
+        self.assertEqual(json.loads(app.settings_file.read_text(encoding="utf-8")), {"theme": "dark"})
+
+    @mock.patch("settings.time.sleep")
+    def test_locked_file_is_written_in_place(self, _sleep):
+        app = AppSettings()
+        app.set("theme", "dark")
+        with mock.patch("settings.os.replace", side_effect=PermissionError):
+            app.save()
+
+        self.assertEqual(json.loads(app.settings_file.read_text(encoding="utf-8")), {"theme": "dark"})
+        self.assertEqual(self._leftover_files(), [])
+
+    @mock.patch("settings.time.sleep")
+    def test_briefly_locked_file_is_replaced_on_retry(self, _sleep):
+        app = AppSettings()
+        app.set("theme", "dark")
+        real_replace = os.replace
+        calls = []
+
+        def replace_after_one_failure(src, dst):
+            calls.append(dst)
+            if len(calls) == 1:
+                raise PermissionError
+            real_replace(src, dst)
+
+        with mock.patch("settings.os.replace", side_effect=replace_after_one_failure):
+            app.save()
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(json.loads(app.settings_file.read_text(encoding="utf-8")), {"theme": "dark"})
+        self.assertEqual(self._leftover_files(), [])
+
+
+class TestSettingsV2Responses(SettingsTestCase):
+    """Tests for the v2 settings router's responses."""
+
+    def test_hand_edited_values_are_coerced(self):
+        self.write_app_settings({"maxConcurrency": "4", "darkMode": "true"})
+
+        response = asyncio.run(settings_v2.get_app_settings())
+        self.assertEqual(response.maxConcurrency, 4)
+        self.assertIs(response.darkMode, True)
+
+    def test_effective_response_is_reused_until_a_file_changes(self):
+        self.write_app_settings({"theme": "dark"})
+        first = asyncio.run(settings_v2.get_effective_settings_no_project())
+        self.assertIs(asyncio.run(settings_v2.get_effective_settings_no_project()), first)
+
+        self.write_app_settings({"theme": "lite", "darkMode": True})
+        response = asyncio.run(settings_v2.get_effective_settings_no_project())
+        self.assertEqual(response.settings["theme"], "lite")
+
+    def test_project_response_sees_hand_edited_project_file(self):
+        self.write_app_settings({"theme": "dark"})
+        first = asyncio.run(settings_v2.get_effective_settings(project_path=self.project))
+        self.assertEqual(first.sources["theme"], "app")
+
+        project_file = self.project / PROJECT_SETTINGS_FILE
+        project_file.parent.mkdir(parents=True, exist_ok=True)
+        project_file.write_text(json.dumps({"theme": "lite"}), encoding="utf-8")
+
+        response = asyncio.run(settings_v2.get_effective_settings(project_path=self.project))
+        self.assertEqual(response.settings["theme"], "lite")
+        self.assertEqual(response.sources["theme"], "project")
+        # Cached per project
+        app_only = asyncio.run(settings_v2.get_effective_settings_no_project())
+        self.assertEqual(app_only.settings["theme"], "dark")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Smart Orchestrator Tests
+========================
+
+Tests for the learning database updates in smart_orchestrator.
+Run with: python test_smart_orchestrator.py
+"""
+
+import gc
+import sqlite3
+import tempfile
+import unittest
+import weakref
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+import smart_orchestrator
+from smart_orchestrator import AttemptRecord, OrchestratorConfig, SmartOrchestrator
+
+
+class OrchestratorTestCase(unittest.TestCase):
+    """Base for tests against an orchestrator on a temporary learning database."""
+
+    config = OrchestratorConfig()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_dir = Path(tmp.name)
+        self.db_path = self.tmp_dir / "learning.db"
+        self.orchestrator = self.make_orchestrator(self.db_path)
+
+    def make_orchestrator(self, db_path: Path, config: OrchestratorConfig | None = None) -> SmartOrchestrator:
+        """Create an orchestrator that is closed when the test finishes."""
+        orchestrator = SmartOrchestrator(db_path, config or self.config)
+        self.addCleanup(orchestrator.close)
+        return orchestrator
+
+
+class TestRecordAttempt(OrchestratorTestCase):
+    """Tests for SmartOrchestrator.record_attempt."""
+
+    config = OrchestratorConfig(learning_threshold=2)
+
+    def test_first_attempt_creates_rows(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True, cost=0.5, duration_ms=100)
+
+        [pattern] = self.orchestrator.get_category_stats()
+        self.assertEqual(pattern["totalAttempts"], 1)
+        self.assertEqual(pattern["successfulAttempts"], 1)
+        self.assertEqual(pattern["successRate"], 100.0)
+
+        [perf] = self.orchestrator.get_model_stats("ui")
+        self.assertEqual(perf["modelId"], "model-a")
+        self.assertEqual(perf["costPerSuccess"], 0.5)
+
+        [overall] = self.orchestrator.get_model_stats()
+        self.assertEqual(overall["totalAttempts"], 1)
+
+    def test_running_averages(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=False, input_tokens=100, cost=1.0)
+        self.orchestrator.record_attempt("ui", "model-a", success=True, input_tokens=300, cost=2.0, attempt_number=2)
+
+        [pattern] = self.orchestrator.get_category_stats()
+        self.assertEqual(pattern["totalAttempts"], 2)
+        self.assertEqual(pattern["successRate"], 50.0)
+        self.assertEqual(pattern["avgInputTokens"], 200)
+        self.assertEqual(pattern["avgCost"], 1.5)
+        self.assertEqual(pattern["avgAttemptsToSuccess"], 2.0)
+
+        [perf] = self.orchestrator.get_model_stats("ui")
+        self.assertEqual(perf["totalCost"], 3.0)
+        self.assertEqual(perf["costPerSuccess"], 3.0)
+
+    def test_iter_stats_stream_the_same_rows(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        self.orchestrator.record_attempt("api", "model-b", success=False)
+
+        categories = self.orchestrator.iter_category_stats()
+        self.assertEqual(next(categories)["category"], "api")
+        self.assertEqual(next(categories)["category"], "ui")
+        self.assertIsNone(next(categories, None))
+        self.assertEqual(list(self.orchestrator.iter_model_stats("ui")), self.orchestrator.get_model_stats("ui"))
+
+    def test_reopening_keeps_updated_at(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True, cost=0.5)
+        [before] = self.orchestrator.get_model_stats("ui")
+
+        # Opening with a different cost weight leaves the rows alone
+        self.make_orchestrator(self.db_path, OrchestratorConfig(cost_weight=0.9))
+        [after] = self.orchestrator.get_model_stats("ui")
+        self.assertEqual(after["updatedAt"], before["updatedAt"])
+
+    def test_best_model_after_threshold(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=False)
+        self.assertIsNone(self.orchestrator.get_category_stats()[0]["bestModel"])
+
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        self.assertEqual(self.orchestrator.get_category_stats()[0]["bestModel"], "model-a")
+
+        # A better success rate takes over once it has enough samples
+        self.orchestrator.record_attempt("ui", "model-b", success=True)
+        self.orchestrator.record_attempt("ui", "model-b", success=True)
+        [pattern] = self.orchestrator.get_category_stats()
+        self.assertEqual(pattern["bestModel"], "model-b")
+        self.assertEqual(pattern["modelSuccessRate"], 100.0)
+
+
+class TestWriteBuffer(OrchestratorTestCase):
+    """Tests for buffering record_attempt writes."""
+
+    config = OrchestratorConfig(flush_threshold=3)
+
+    def _stored_attempts(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute("SELECT SUM(total_attempts) FROM feature_patterns").fetchone()[0]
+
+    def test_attempts_wait_for_flush(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        self.orchestrator.record_attempt("api", "model-a", success=False)
+        self.assertIsNone(self._stored_attempts())
+
+        self.assertEqual(self.orchestrator.flush(), 2)
+        self.assertEqual(self._stored_attempts(), 2)
+        self.assertEqual(self.orchestrator.flush(), 0)
+
+    def test_threshold_triggers_flush(self):
+        for _ in range(3):
+            self.orchestrator.record_attempt("ui", "model-a", success=True, cost=0.5)
+        self.assertEqual(self._stored_attempts(), 3)
+
+    def test_reads_see_buffered_attempts(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True, input_tokens=100)
+        self.orchestrator.record_attempt("ui", "model-a", success=False, input_tokens=300)
+
+        [pattern] = self.orchestrator.get_category_stats()
+        self.assertEqual(pattern["totalAttempts"], 2)
+        self.assertEqual(pattern["avgInputTokens"], 200)
+
+    def test_close_flushes_and_releases(self):
+        orchestrator = SmartOrchestrator(self.db_path, self.config)
+        orchestrator.record_attempt("ui", "model-a", success=True)
+        orchestrator.close()
+        self.assertEqual(self._stored_attempts(), 1)
+
+        # Nothing else (such as the atexit hook) keeps it alive
+        ref = weakref.ref(orchestrator)
+        del orchestrator
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_invalid_attempt_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.orchestrator.record_attempt("ui", "model-a", success=True, attempt_number=0)
+        with self.assertRaises(ValueError):
+            self.orchestrator.record_attempt("ui", "model-a", success=True, cost=None)
+
+        # Nothing was buffered for either, so later writes and reads still agree
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        self.assertEqual(self.orchestrator.get_category_stats()[0]["totalAttempts"], 1)
+        self.assertEqual(self.orchestrator.get_model_stats("ui")[0]["totalAttempts"], 1)
+        self.assertEqual(self.orchestrator.get_model_stats()[0]["totalAttempts"], 1)
+
+    def test_rejected_delta_is_dropped(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        self.orchestrator.record_attempt("db", "model-a", success=True)
+        # A delta the database refuses (NULL estimated_difficulty)
+        self.orchestrator._pending_patterns["db"]["attempts_to_success"] = 0
+
+        with self.assertLogs("smart_orchestrator", "ERROR"):
+            self.assertEqual(self.orchestrator.flush(), 1)
+        self.assertEqual([p["category"] for p in self.orchestrator.get_category_stats()], ["ui"])
+
+        self.orchestrator.record_attempt("db", "model-a", success=True)
+        self.assertEqual(self.orchestrator.flush(), 1)
+        self.assertEqual(self._stored_attempts(), 2)
+
+    def test_locked_database_keeps_attempts_buffered(self):
+        locked = OperationalError("INSERT", {}, Exception("database is locked"))
+        with mock.patch.object(self.orchestrator, "_write_deltas", side_effect=locked):
+            with self.assertLogs("smart_orchestrator", "WARNING"):
+                for _ in range(3):
+                    self.orchestrator.record_attempt("ui", "model-a", success=True)
+
+        # Not raised, so not retried by the caller: each attempt counted once
+        self.assertIsNone(self._stored_attempts())
+        self.assertEqual(self.orchestrator.flush(), 3)
+        self.assertEqual(self._stored_attempts(), 3)
+        self.assertEqual(self.orchestrator.get_model_stats()[0]["totalAttempts"], 3)
+
+
+class TestRecommendationCache(OrchestratorTestCase):
+    """Tests for the SmartOrchestrator.get_recommendation cache."""
+
+    config = OrchestratorConfig(learning_threshold=1)
+
+    def test_repeated_calls_are_cached(self):
+        first = self.orchestrator.get_recommendation("ui")
+        self.assertIs(self.orchestrator.get_recommendation("ui"), first)
+        self.assertIsNot(self.orchestrator.get_recommendation("ui", num_steps=2), first)
+
+    def test_record_attempt_invalidates_category(self):
+        self.assertEqual(self.orchestrator.get_recommendation("ui").confidence, 0.0)
+        api = self.orchestrator.get_recommendation("api")
+
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        self.assertEqual(self.orchestrator.get_recommendation("ui").recommended_model, "model-a")
+        self.assertIs(self.orchestrator.get_recommendation("api"), api)
+
+    def test_revalidated_by_version_after_ttl(self):
+        self.orchestrator._reco_ttl = 0.0
+        self.orchestrator.record_attempt("ui", "model-a", success=True)
+        first = self.orchestrator.get_recommendation("ui")
+        self.assertIs(self.orchestrator.get_recommendation("ui"), first)
+
+        # A write from another orchestrator (or process) bumps the version
+        other = self.make_orchestrator(self.db_path)
+        other.record_attempt("ui", "model-a", success=False)
+        other.flush()
+        self.assertEqual(self.orchestrator.get_recommendation("ui").confidence, 2 / 50)
+
+    def test_each_instance_ranks_with_its_own_cost_weight(self):
+        quality = self.make_orchestrator(self.db_path, OrchestratorConfig(learning_threshold=1, cost_weight=0.0))
+        quality.record_attempt("ui", "cheap", success=True, cost=0.1)
+        quality.record_attempt("ui", "cheap", success=False, cost=0.1)
+        quality.record_attempt("ui", "pricey", success=True, cost=5.0)
+        quality.flush()
+
+        thrifty = self.make_orchestrator(self.db_path, OrchestratorConfig(learning_threshold=1, cost_weight=1.0))
+        self.assertEqual(thrifty.get_recommendation("ui").recommended_model, "cheap")
+        self.assertEqual(quality.get_recommendation("ui").recommended_model, "pricey")
+
+    def test_revalidation_keeps_own_cost_weight(self):
+        quality = self.make_orchestrator(self.db_path, OrchestratorConfig(learning_threshold=1, cost_weight=0.0))
+        quality._reco_ttl = 0.0
+        quality.record_attempt("ui", "cheap", success=True, cost=0.1)
+        quality.record_attempt("ui", "cheap", success=False, cost=0.1)
+        quality.record_attempt("ui", "pricey", success=True, cost=5.0)
+        self.assertEqual(quality.get_recommendation("ui").recommended_model, "pricey")
+
+        # Another weight writing to the category only bumps the version
+        thrifty = self.make_orchestrator(self.db_path, OrchestratorConfig(learning_threshold=1, cost_weight=1.0))
+        thrifty.record_attempt("ui", "pricey", success=True, cost=5.0)
+        thrifty.flush()
+        self.assertEqual(thrifty.get_recommendation("ui").recommended_model, "cheap")
+        self.assertEqual(quality.get_recommendation("ui").recommended_model, "pricey")
+
+    def test_invalidate_cache(self):
+        first = self.orchestrator.get_recommendation("ui")
+        self.orchestrator.invalidate_cache()
+        self.assertIsNot(self.orchestrator.get_recommendation("ui"), first)
+
+
+class TestGenerateInsights(OrchestratorTestCase):
+    """Tests for SmartOrchestrator.generate_insights."""
+
+    config = OrchestratorConfig(learning_threshold=2)
+
+    def test_insights_are_not_repeated(self):
+        self.orchestrator.record_attempts_bulk([
+            AttemptRecord("db", "model-a", False),
+            AttemptRecord("db", "model-a", False),
+            AttemptRecord("db", "model-a", False),
+            AttemptRecord("db", "model-a", True, attempt_number=4),
+            AttemptRecord("ui", "model-a", True, cost=1.0),
+            AttemptRecord("ui", "model-a", True, cost=1.0),
+            AttemptRecord("ui", "model-b", True, cost=0.1),
+            AttemptRecord("ui", "model-b", True, cost=0.1),
+        ])
+
+        self.assertEqual(len(self.orchestrator.generate_insights()), 2)
+        self.assertEqual(
+            sorted((i["insightType"], i["category"]) for i in self.orchestrator.get_insights()),
+            [("cost_optimization", "ui"), ("high_difficulty", "db")],
+        )
+
+        # Recent insights are not generated again
+        self.assertEqual(self.orchestrator.generate_insights(), [])
+
+
+class TestRecordAttemptsBulk(OrchestratorTestCase):
+    """Tests for SmartOrchestrator.record_attempts_bulk."""
+
+    RECORDS = [
+        AttemptRecord("ui", "model-a", False, input_tokens=100, cost=1.0, duration_ms=50),
+        AttemptRecord("ui", "model-a", True, input_tokens=300, cost=2.0, attempt_number=2, num_steps=3),
+        AttemptRecord("api", "model-b", True, output_tokens=40, cost=0.5),
+        AttemptRecord("ui", "model-b", True, cost=0.25),
+        AttemptRecord("ui", "model-b", True, cost=0.25),
+    ]
+
+    config = OrchestratorConfig(learning_threshold=2)
+
+    def setUp(self):
+        super().setUp()
+        self.bulk = self.orchestrator
+        # single writes each attempt as it is recorded
+        self.single = self.make_orchestrator(
+            self.tmp_dir / "single.db",
+            OrchestratorConfig(learning_threshold=2, flush_threshold=1),
+        )
+
+    @staticmethod
+    def _without_timestamps(rows):
+        return [{k: v for k, v in row.items() if k not in ("id", "updatedAt")} for row in rows]
+
+    def test_matches_sequential_record_attempt(self):
+        for r in self.RECORDS:
+            self.single.record_attempt(
+                r.category, r.model_id, r.success, r.input_tokens, r.output_tokens,
+                r.cost, r.duration_ms, r.attempt_number, r.num_steps,
+            )
+        self.bulk.record_attempts_bulk(self.RECORDS)
+
+        self.assertEqual(
+            self._without_timestamps(self.bulk.get_category_stats()),
+            self._without_timestamps(self.single.get_category_stats()),
+        )
+        for category in (None, "ui", "api"):
+            self.assertEqual(
+                self._without_timestamps(self.bulk.get_model_stats(category)),
+                self._without_timestamps(self.single.get_model_stats(category)),
+            )
+
+    def test_empty_batch(self):
+        self.bulk.record_attempts_bulk([])
+        self.assertEqual(self.bulk.get_category_stats(), [])
+
+
+class TestMigrations(OrchestratorTestCase):
+    """Tests for upgrading existing learning databases."""
+
+    def _reopen(self) -> SmartOrchestrator:
+        """Close the orchestrator and open the database again, rerunning the migrations."""
+        self.orchestrator.close()
+        smart_orchestrator._schema_ready.discard(str(self.db_path.resolve()))
+        return self.make_orchestrator(self.db_path)
+
+    def test_duplicate_rows_are_merged(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True, input_tokens=100, cost=1.0)
+        self.orchestrator.record_attempt("ui", "model-a", success=False, input_tokens=300, cost=3.0)
+        self.orchestrator.flush()
+
+        # A copy of each row, as a hand-edited database could have
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DROP INDEX uq_pattern_category")
+            conn.execute("DROP INDEX uq_perf_model_category")
+            conn.execute("DROP INDEX uq_perf_model_overall")
+            for table in ("feature_patterns", "model_performance"):
+                columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] != "id")
+                conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}")
+
+        with self.assertLogs("smart_orchestrator", "WARNING"):
+            orchestrator = self._reopen()
+        [pattern] = orchestrator.get_category_stats()
+        self.assertEqual(pattern["totalAttempts"], 4)
+        self.assertEqual(pattern["successRate"], 50.0)
+        self.assertEqual(pattern["avgInputTokens"], 200)
+        [perf] = orchestrator.get_model_stats("ui")
+        self.assertEqual(perf["totalCost"], 8.0)
+        self.assertEqual(perf["costPerSuccess"], 4.0)
+
+    def test_redundant_indexes_are_dropped(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE INDEX ix_perf_model_category ON model_performance (model_id, category)")
+            conn.execute("CREATE INDEX ix_model_performance_id ON model_performance (id)")
+
+        self._reopen()
+        with sqlite3.connect(self.db_path) as conn:
+            names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertEqual(
+            names & {"ix_perf_model_category", "ix_model_performance_id", "ix_model_performance_model_id"}, set()
+        )
+        self.assertIn("uq_perf_model_category", names)
+
+    def test_averages_layout_is_converted_past_an_interrupted_rebuild(self):
+        self.orchestrator.record_attempt("ui", "model-a", success=True, input_tokens=100, cost=1.0)
+        self.orchestrator.record_attempt("ui", "model-a", success=False, input_tokens=300, cost=3.0)
+        self.orchestrator.flush()
+
+        # Back to the running-averages layout, with the new table of a
+        # rebuild that never finished
+        with sqlite3.connect(self.db_path) as conn:
+            for name in ("attempts_to_success", "input_tokens", "output_tokens", "cost", "duration_ms", "steps"):
+                conn.execute(f"ALTER TABLE feature_patterns RENAME COLUMN total_{name} TO avg_{name}")
+            conn.execute("UPDATE feature_patterns SET avg_input_tokens = 200, avg_cost = 2.0")
+            conn.execute("CREATE TABLE feature_patterns_new (id INTEGER PRIMARY KEY)")
+
+        orchestrator = self._reopen()
+        [pattern] = orchestrator.get_category_stats()
+        self.assertEqual(pattern["avgInputTokens"], 200)
+        self.assertEqual(pattern["avgCost"], 2.0)
+        with sqlite3.connect(self.db_path) as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn("feature_patterns_new", tables)
+
+
+if __name__ == "__main__":
+    unittest.main()